@@ -0,0 +1,38 @@
+"""add expires_at and finished_at to monitoring_jobs
+
+Revision ID: 5e8d2c41f0a7
+Revises: 9b126a35ce87
+Create Date: 2026-10-17 14:22:08.310457
+
+expires_at is backfilled from created_at + total_duration_seconds so expiry filters can
+use an index. Jobs that had already expired are marked finished here, so the first reaper
+run does not send final summaries for long-gone jobs.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8d2c41f0a7'
+down_revision: Union[str, None] = '9b126a35ce87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('monitoring_jobs', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.add_column('monitoring_jobs', sa.Column('finished_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE monitoring_jobs SET expires_at = created_at + total_duration_seconds * interval '1 second'")
+    op.alter_column('monitoring_jobs', 'expires_at', nullable=False)
+    op.execute("UPDATE monitoring_jobs SET finished_at = timezone('utc', now()) WHERE expires_at <= timezone('utc', now())")
+    op.create_index('ix_monitoring_jobs_unfinished_expires_at', 'monitoring_jobs', ['expires_at'], unique=False,
+                    postgresql_where=sa.text('finished_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_monitoring_jobs_unfinished_expires_at', table_name='monitoring_jobs', postgresql_where=sa.text('finished_at IS NULL'))
+    op.drop_column('monitoring_jobs', 'finished_at')
+    op.drop_column('monitoring_jobs', 'expires_at')
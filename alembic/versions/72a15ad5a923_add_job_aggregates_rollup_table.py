@@ -0,0 +1,47 @@
+"""add job_aggregates rollup table
+
+Revision ID: 72a15ad5a923
+Revises: 2491a531b839
+Create Date: 2026-10-17 10:12:41.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '72a15ad5a923'
+down_revision: Union[str, None] = '2491a531b839'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job_aggregates',
+    sa.Column('job_id', sa.UUID(), nullable=False),
+    sa.Column('interval_count', sa.Integer(), nullable=False),
+    sa.Column('sentiment_mean', sa.Float(), nullable=False),
+    sa.Column('sentiment_m2', sa.Float(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['monitoring_jobs.job_id'], ),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    # Backfill from existing intervals; M2 is the population variance times the count
+    op.execute("""
+        INSERT INTO job_aggregates (job_id, interval_count, sentiment_mean, sentiment_m2, confidence_sum, updated_at)
+        SELECT job_id,
+               COUNT(avg_sentiment),
+               COALESCE(AVG(avg_sentiment), 0),
+               COALESCE(VAR_POP(avg_sentiment) * COUNT(avg_sentiment), 0),
+               COALESCE(SUM(avg_confidence), 0),
+               MAX(timestamp)
+        FROM interval_results
+        GROUP BY job_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('job_aggregates')
@@ -0,0 +1,105 @@
+"""add hot-query indexes and optional interval_results partitioning
+
+Revision ID: 9b126a35ce87
+Revises: 72a15ad5a923
+Create Date: 2026-10-17 11:03:27.551906
+
+Partitioning is opt-in because it rewrites interval_results:
+
+    alembic -x partition_interval_results=true upgrade head
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b126a35ce87'
+down_revision: Union[str, None] = '72a15ad5a923'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions are created from the oldest existing row up to this many months ahead;
+# scripts/interval_partitions.py keeps creating new ones and applies the retention policy.
+PARTITION_MONTHS_AHEAD = 3
+
+
+def _partitioning_requested() -> bool:
+    return context.get_x_argument(as_dictionary=True).get('partition_interval_results', 'false').lower() == 'true'
+
+
+def _partition_interval_results() -> None:
+    op.execute("ALTER TABLE interval_results RENAME TO interval_results_unpartitioned")
+    op.execute("""
+        CREATE TABLE interval_results (
+            id UUID NOT NULL,
+            job_id UUID NOT NULL REFERENCES monitoring_jobs (job_id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            avg_sentiment FLOAT,
+            avg_confidence FLOAT,
+            summary VARCHAR,
+            raw_comments JSON,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("CREATE TABLE interval_results_default PARTITION OF interval_results DEFAULT")
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month_start DATE := date_trunc('month', COALESCE((SELECT MIN(timestamp) FROM interval_results_unpartitioned), now()));
+        BEGIN
+            WHILE month_start <= date_trunc('month', now()) + interval '{PARTITION_MONTHS_AHEAD} months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF interval_results FOR VALUES FROM (%L) TO (%L)',
+                    'interval_results_' || to_char(month_start, 'YYYY_MM'), month_start, month_start + interval '1 month'
+                );
+                month_start := month_start + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute("""
+        INSERT INTO interval_results (id, job_id, timestamp, avg_sentiment, avg_confidence, summary, raw_comments)
+        SELECT id, job_id, timestamp, avg_sentiment, avg_confidence, summary, raw_comments FROM interval_results_unpartitioned
+    """)
+    op.execute("DROP TABLE interval_results_unpartitioned")
+
+
+def _unpartition_interval_results() -> None:
+    op.execute("ALTER TABLE interval_results RENAME TO interval_results_partitioned")
+    op.create_table('interval_results',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('job_id', sa.UUID(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('avg_sentiment', sa.Float(), nullable=True),
+    sa.Column('avg_confidence', sa.Float(), nullable=True),
+    sa.Column('summary', sa.String(), nullable=True),
+    sa.Column('raw_comments', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['monitoring_jobs.job_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("""
+        INSERT INTO interval_results (id, job_id, timestamp, avg_sentiment, avg_confidence, summary, raw_comments)
+        SELECT id, job_id, timestamp, avg_sentiment, avg_confidence, summary, raw_comments FROM interval_results_partitioned
+    """)
+    op.execute("DROP TABLE interval_results_partitioned CASCADE")
+
+
+def upgrade() -> None:
+    if _partitioning_requested():
+        _partition_interval_results()
+    # On a partitioned table this index is created on every partition
+    op.create_index('ix_interval_results_job_id_timestamp', 'interval_results', ['job_id', 'timestamp'], unique=False)
+    op.create_index('ix_monitoring_jobs_unscheduled', 'monitoring_jobs', ['created_at'], unique=False,
+                    postgresql_where=sa.text('is_scheduled = false'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_monitoring_jobs_unscheduled', table_name='monitoring_jobs', postgresql_where=sa.text('is_scheduled = false'))
+    op.drop_index('ix_interval_results_job_id_timestamp', table_name='interval_results')
+    is_partitioned = op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'interval_results'::regclass)"
+    )).scalar()
+    if is_partitioned:
+        _unpartition_interval_results()
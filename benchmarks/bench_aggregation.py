@@ -0,0 +1,56 @@
+"""
+Per-message interval aggregation: the previous pydantic + pandas path against the NumPy kernel.
+
+    python -m benchmarks.bench_aggregation [comments_per_message] [messages]
+"""
+import json
+import random
+import sys
+import time
+from src.aggregation_service.kernels import LABEL_CODES, aggregate_interval
+from src.models import AnalysisOutput
+
+def make_rows(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    labels = list(LABEL_CODES)
+    return [{'text': '', 'sentiment': rng.choice(labels), 'confidence': rng.random(), 'skipped': False} for _ in range(n)]
+
+def pandas_path(body: bytes):
+    import pandas as pd
+    data = json.loads(body)
+    results = [AnalysisOutput(**r) for r in data['results']]
+    df = pd.DataFrame([r.model_dump() for r in results])
+    df['sentiment_numeric'] = df['sentiment'].map(LABEL_CODES)
+    return (df['sentiment_numeric'] * df['confidence']).sum() / df['confidence'].sum(), df['confidence'].mean()
+
+def kernel_path(body: bytes):
+    return aggregate_interval(json.loads(body)['results'])
+
+def bench(label: str, fn, body: bytes, messages: int):
+    start = time.perf_counter()
+    for _ in range(messages):
+        fn(body)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / messages * 1e6:10.1f} us/message")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rows = make_rows(n)
+    row_body = json.dumps({'job_id': 'j', 'results': rows}).encode()
+    columnar_body = json.dumps({'job_id': 'j', 'results': {
+        'sentiment': [r['sentiment'] for r in rows],
+        'confidence': [r['confidence'] for r in rows],
+        'skipped': [r['skipped'] for r in rows],
+    }}).encode()
+
+    start = time.perf_counter()
+    import pandas, scipy.stats  # noqa: F401
+    print(f"{'pandas+scipy import':<28} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    bench("pydantic + pandas (rows)", pandas_path, row_body, messages)
+    bench("numpy kernel (rows)", kernel_path, row_body, messages)
+    bench("numpy kernel (columnar)", kernel_path, columnar_body, messages)
+
+if __name__ == "__main__":
+    main()
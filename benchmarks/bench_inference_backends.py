@@ -0,0 +1,45 @@
+"""
+Load time, throughput and single-request latency of each inference backend on CPU.
+
+    python -m benchmarks.bench_inference_backends [num_comments] [backend ...]
+"""
+import importlib.util
+import random
+import statistics
+import sys
+import time
+from src.ai_service.backends import load_sentiment_pipeline
+
+VOCAB = ["love", "this", "video", "great", "editing", "terrible", "audio", "first", "lol", "song",
+         "boring", "amazing", "why", "not", "the", "ending", "made", "my", "day", "subscribed"]
+
+def make_texts(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCAB) for _ in range(min(int(rng.lognormvariate(2.0, 0.8)) + 1, 200))) for _ in range(n)]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    backends = sys.argv[2:] or ["torch", "quantized"] + (["onnx"] if importlib.util.find_spec("optimum") else [])
+    texts = make_texts(n)
+
+    for backend in backends:
+        start = time.perf_counter()
+        pipe = load_sentiment_pipeline(backend)
+        load_time = time.perf_counter() - start
+        pipe(texts[:8], truncation=True)  # warm up
+
+        start = time.perf_counter()
+        pipe(sorted(texts, key=len), batch_size=64, truncation=True)
+        elapsed = time.perf_counter() - start
+
+        latencies = []
+        for text in texts[:200]:
+            start = time.perf_counter()
+            pipe(text, truncation=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"{backend:<10} load {load_time:6.1f}s  {n / elapsed:8.1f} comments/s  "
+              f"p50 {statistics.median(latencies):6.1f}ms  p95 {latencies[int(len(latencies) * 0.95)]:6.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Throughput benchmark for the preprocessing backends.
+
+    python -m benchmarks.bench_preprocessor [num_comments]
+"""
+import random
+import sys
+import time
+import spacy
+from src.ingestion_service.preprocessor import get_nlp, preprocess_text, preprocess_texts
+
+WORDS = ["love", "this", "video", "the", "editing", "is", "insane", "not", "sure", "about", "that", "ending",
+         "who's", "watching", "in", "2025", "don't", "agree", "lol", "😂", "🔥", "great", "tutorial", "10/10",
+         "@creator", "please", "make", "more", "https://example.com/watch", "gonna", "share", "with", "friends"]
+
+def make_comments(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    # Most YouTube comments are short; a few are long rants
+    lengths = [min(int(rng.lognormvariate(2.0, 0.9)) + 1, 300) for _ in range(n)]
+    return [" ".join(rng.choice(WORDS) for _ in range(length)) + rng.choice(["", "!", "!!!", "?", "."]) for length in lengths]
+
+def bench(label: str, fn, texts: list):
+    start = time.perf_counter()
+    fn(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.3f}s  {len(texts) / elapsed:10.0f} comments/s")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    texts = make_comments(n)
+    backends = ["tokenizer", "regex"]
+    if spacy.util.is_package("en_core_web_sm"):
+        backends.insert(0, "model")
+
+    for backend in backends:
+        if backend != "regex":
+            start = time.perf_counter()
+            get_nlp(backend)
+            print(f"{backend + ' load':<32} {time.perf_counter() - start:8.3f}s")
+        bench(f"{backend} per-comment", lambda ts: [preprocess_text(t, backend=backend) for t in ts], texts)
+        bench(f"{backend} batched", lambda ts: preprocess_texts(ts, backend=backend, n_process=1), texts)
+
+if __name__ == "__main__":
+    main()
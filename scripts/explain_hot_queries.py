@@ -0,0 +1,97 @@
+"""
+Seeds synthetic jobs and intervals, then prints EXPLAIN ANALYZE plans for the hot queries
+with and without the indexes from migrations 9b126a35ce87 and 5e8d2c41f0a7.
+
+Everything runs in one transaction that is rolled back, so the database is left unchanged.
+Dropping the indexes inside it still takes exclusive locks: use a dev database.
+
+    python -m scripts.explain_hot_queries --jobs 20000 --intervals-per-job 200
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+DB_URL = os.getenv("DB_URL")
+
+INDEXES = {
+    "ix_interval_results_job_id_timestamp": "CREATE INDEX ix_interval_results_job_id_timestamp ON interval_results (job_id, timestamp)",
+    "ix_monitoring_jobs_unscheduled": "CREATE INDEX ix_monitoring_jobs_unscheduled ON monitoring_jobs (created_at) WHERE is_scheduled = false",
+    "ix_monitoring_jobs_unfinished_expires_at": "CREATE INDEX ix_monitoring_jobs_unfinished_expires_at ON monitoring_jobs (expires_at) WHERE finished_at IS NULL",
+}
+
+HOT_QUERIES = {
+    "summary (GET /summary/{job_id})": """
+        SELECT count(avg_sentiment), avg(avg_sentiment), stddev_samp(avg_sentiment), avg(avg_confidence),
+               (SELECT avg_sentiment FROM interval_results WHERE job_id = :job_id ORDER BY timestamp DESC LIMIT 1),
+               (SELECT avg_confidence FROM interval_results WHERE job_id = :job_id ORDER BY timestamp DESC LIMIT 1)
+        FROM interval_results WHERE job_id = :job_id
+    """,
+    "unscheduled jobs (refresh_dynamic_schedule)": """
+        SELECT job_id, post_id, intervals_seconds FROM monitoring_jobs
+        WHERE is_scheduled = false AND finished_at IS NULL
+          AND expires_at > timezone('utc', now())
+    """,
+    "expired jobs (reap_expired_jobs)": """
+        SELECT job_id FROM monitoring_jobs
+        WHERE finished_at IS NULL AND expires_at <= timezone('utc', now())
+        ORDER BY expires_at LIMIT 1000
+    """,
+}
+
+def seed(conn, jobs: int, intervals_per_job: int):
+    # Most jobs are already scheduled; a small backlog of new ones is waiting for the refresh tick
+    conn.execute(text("""
+        INSERT INTO monitoring_jobs (job_id, post_id, post_title, user_full_name, email, intervals_seconds,
+                                     total_duration_seconds, is_scheduled, created_at, expires_at)
+        SELECT gen_random_uuid(), 'post' || (i % 500), 'Synthetic', 'Load Test', 'load@test.local', 14400, 604800,
+               i % 100 <> 0, created_at, created_at + interval '604800 seconds'
+        FROM generate_series(1, :jobs) AS i,
+             LATERAL (SELECT timezone('utc', now()) - (i % 14) * interval '1 day' AS created_at) AS t
+    """), {"jobs": jobs})
+    conn.execute(text("""
+        INSERT INTO interval_results (id, job_id, timestamp, avg_sentiment, avg_confidence)
+        SELECT gen_random_uuid(), job_id, created_at + n * interval '4 hours', random() * 2, random()
+        FROM monitoring_jobs, generate_series(1, :intervals) AS n
+        WHERE email = 'load@test.local'
+    """), {"intervals": intervals_per_job})
+    conn.execute(text("ANALYZE monitoring_jobs"))
+    conn.execute(text("ANALYZE interval_results"))
+
+def explain_all(conn, job_id):
+    for label, query in HOT_QUERIES.items():
+        plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + query), {"job_id": job_id}).scalars()
+        print(f"--- {label}")
+        print("\n".join(plan))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--intervals-per-job", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine(DB_URL)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            print(f"Seeding {args.jobs} jobs x {args.intervals_per_job} intervals...")
+            seed(conn, args.jobs, args.intervals_per_job)
+            job_id = conn.execute(text("SELECT job_id FROM monitoring_jobs WHERE email = 'load@test.local' LIMIT 1")).scalar()
+
+            for name in INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            print("\n=== BEFORE (no secondary indexes)")
+            explain_all(conn, job_id)
+
+            for ddl in INDEXES.values():
+                conn.execute(text(ddl))
+            conn.execute(text("ANALYZE monitoring_jobs"))
+            conn.execute(text("ANALYZE interval_results"))
+            print("\n=== AFTER")
+            explain_all(conn, job_id)
+        finally:
+            transaction.rollback()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Maintains monthly partitions of interval_results (see migration 9b126a35ce87).
+
+Creates partitions for the next few months and drops whole months older than the
+retention period. Run it daily, e.g. from cron:
+
+    python -m scripts.interval_partitions --months-ahead 3 --retention-days 180
+
+Overall job aggregates live in job_aggregates, so dropping old intervals does not change
+the overall sentiment sent in notifications.
+"""
+import argparse
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+DB_URL = os.getenv("DB_URL")
+INTERVAL_RESULTS_RETENTION_DAYS = int(os.getenv("INTERVAL_RESULTS_RETENTION_DAYS", "180"))
+
+PARTITION_NAME = re.compile(r"^interval_results_(\d{4})_(\d{2})$")
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def existing_partitions(conn) -> dict:
+    rows = conn.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = 'interval_results'
+    """)).scalars()
+    partitions = {}
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[name] = date(int(match.group(1)), int(match.group(2)), 1)
+    return partitions
+
+def ensure_partitions(conn, months_ahead: int):
+    partitions = existing_partitions(conn)
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    for offset in range(months_ahead + 1):
+        month_start = add_months(this_month, offset)
+        name = f"interval_results_{month_start:%Y_%m}"
+        if name not in partitions:
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF interval_results "
+                f"FOR VALUES FROM ('{month_start}') TO ('{add_months(month_start, 1)}')"
+            ))
+            print(f"created {name}")
+
+def drop_expired_partitions(conn, retention_days: int):
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=retention_days)
+    for name, month_start in sorted(existing_partitions(conn).items()):
+        if add_months(month_start, 1) <= cutoff:
+            conn.execute(text(f"DROP TABLE {name}"))
+            print(f"dropped {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument("--retention-days", type=int, default=INTERVAL_RESULTS_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    engine = create_engine(DB_URL)
+    with engine.begin() as conn:
+        is_partitioned = conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'interval_results'::regclass)"
+        )).scalar()
+        if not is_partitioned:
+            raise SystemExit("interval_results is not partitioned; run the migration with -x partition_interval_results=true")
+        ensure_partitions(conn, args.months_ahead)
+        drop_expired_partitions(conn, args.retention_days)
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from dotenv import load_dotenv
 import os
 import pika
-import json
 from typing import List
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import structlog
-import pandas as pd
-import scipy.stats
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, select
+from redis import Redis
+from redis.exceptions import RedisError
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-from src.models import Aggregate, IntervalResultDB, AnalysisOutput
+from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.models import Aggregate, IntervalResultDB, JobAggregateDB
+from src.aggregation_service.kernels import payload_partials, finalize_interval
+from src.aggregation_service.chunks import add_chunk, release_chunk, clear_chunks
+from src.utils import welford_update, mean_confidence_interval
 from src.models import Base
+from src.codec import encode, decode
 
 load_dotenv()
 DB_URL = os.getenv("DB_URL")
 RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+REDIS_URL = os.getenv("REDIS_URL")
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "300"))
 
 app = FastAPI(title="Analytics Aggregation Service")
 logger = structlog.get_logger()
@@ -25,27 +31,85 @@ logger = structlog.get_logger()
 engine = create_engine(DB_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base.metadata.create_all(bind=engine)
+redis_client = Redis.from_url(REDIS_URL)
+
+# Every new interval bumps the job's generation, so a summary computed before it lands under a key
+# nobody reads any more instead of overwriting an invalidation
+SUMMARY_GENERATION_TTL_SECONDS = 7 * 24 * 3600
+
+def summary_generation_key(job_id: str) -> str:
+    return f"vibesense:summary-gen:{job_id}"
+
+def summary_cache_key(job_id: str, generation: int) -> str:
+    return f"vibesense:summary:{job_id}:{generation}"
 
 # API Endpoint for testing
 @app.get("/summary/{job_id}", response_model=Aggregate)
-async def get_summary(job_id: str):
+def get_summary(job_id: str):
     """Retrieve aggregate summary for a job."""
+    # The generation is read before the query, so a result that raced a new interval is never served
+    generation = None
+    try:
+        generation = int(redis_client.get(summary_generation_key(job_id)) or 0)
+        cached = redis_client.get(summary_cache_key(job_id, generation))
+        if cached is not None:
+            return Aggregate.model_validate_json(cached)
+    except RedisError as e:
+        logger.warning("Summary cache unavailable", error=str(e))
+
+    # One round trip: overall statistics plus the latest interval via scalar subqueries
+    latest = select(IntervalResultDB).where(IntervalResultDB.job_id == job_id).order_by(IntervalResultDB.timestamp.desc()).limit(1).correlate(None)
+    query = select(
+        func.count(IntervalResultDB.avg_sentiment),
+        func.avg(IntervalResultDB.avg_sentiment),
+        func.stddev_samp(IntervalResultDB.avg_sentiment),
+        func.avg(IntervalResultDB.avg_confidence),
+        latest.with_only_columns(IntervalResultDB.avg_sentiment).scalar_subquery(),
+        latest.with_only_columns(IntervalResultDB.avg_confidence).scalar_subquery(),
+    ).where(IntervalResultDB.job_id == job_id)
+
     db = SessionLocal()
     try:
-        results = db.query(IntervalResultDB).filter(IntervalResultDB.job_id == job_id).all()
-        if not results:
-            raise ValueError("No results found for the job")
-        df = pd.DataFrame([r.model_dump() for r in results])
-        overall_sentiment = df['avg_sentiment'].mean()
-        ci = scipy.stats.norm.interval(0.95, loc=overall_sentiment, scale=df['avg_sentiment'].std()/len(df)**0.5)
-        summary = " ".join(df['summary'].tolist())
-        return Aggregate(
-            interval_sentiment=results[-1].avg_sentiment if results else 0.0,
-            overall_sentiment=overall_sentiment,
-            ci=ci,
-            summary=summary)
+        count, overall_sentiment, stddev, overall_confidence, interval_sentiment, interval_confidence = db.execute(query).one()
     finally:
         db.close()
+    if not count:
+        raise HTTPException(status_code=404, detail="No results found for the job")
+
+    m2 = (stddev or 0.0) ** 2 * (count - 1)
+    summary = Aggregate(
+        interval_sentiment=interval_sentiment,
+        interval_confidence=interval_confidence,
+        overall_sentiment=overall_sentiment,
+        overall_confidence=overall_confidence,
+        overall_ci=mean_confidence_interval(count, overall_sentiment, m2)
+    )
+    if generation is not None:
+        try:
+            redis_client.set(summary_cache_key(job_id, generation), summary.model_dump_json(), ex=SUMMARY_CACHE_TTL_SECONDS)
+        except RedisError as e:
+            logger.warning("Summary cache unavailable", error=str(e))
+    return summary
+
+def update_job_rollup(db, job_id: str, avg_sentiment: float, avg_confidence: float) -> JobAggregateDB:
+    """Adds one interval to the job's running aggregates. The row stays locked until the caller commits."""
+    db.execute(pg_insert(JobAggregateDB).values(
+        job_id=job_id, interval_count=0, sentiment_mean=0.0, sentiment_m2=0.0, confidence_sum=0.0
+    ).on_conflict_do_nothing(index_elements=['job_id']))
+    rollup = db.query(JobAggregateDB).filter(JobAggregateDB.job_id == job_id).with_for_update().one()
+    rollup.interval_count, rollup.sentiment_mean, rollup.sentiment_m2 = welford_update(
+        rollup.interval_count, rollup.sentiment_mean, rollup.sentiment_m2, float(avg_sentiment)
+    )
+    rollup.confidence_sum += float(avg_confidence)
+    rollup.updated_at = datetime.now(timezone.utc)
+    return rollup
+
+def discard_chunks(metadata: dict):
+    """Drops chunk state of a stored interval; the finalized marker keeps redeliveries from storing it twice."""
+    try:
+        clear_chunks(redis_client, metadata['job_id'], metadata['interval_timestamp'])
+    except RedisError as e:
+        logger.warning("Chunk cleanup failed, state expires on its own", metadata=metadata, error=str(e))
 
 # Queue Consumer (Run in Worker Process)
 def run_consumer():
@@ -59,25 +123,37 @@ def run_consumer():
 
         def callback(ch, method, properties, body):
             db = SessionLocal()
+            # Set while this message holds an interval it finalized but has not committed yet
+            finalized_chunk = None
             try:
-                data = json.loads(body)
-                results = [AnalysisOutput(**r) for r in data['results']]
-                metadata = {k: v for k, v in data.items() if k != 'results'}
-
-                # Aggregate Interval
-                df = pd.DataFrame([r.model_dump() for r in results])
-                mapping = {
-                    'Very Negative': 0,
-                    'Negative': 0,
-                    'Neutral': 1,
-                    'Positive': 2,
-                    'Very Positive': 2
-                }
-                df['sentiment_numeric'] = df['sentiment'].map(mapping)
-                avg_sentiment = avg_sentiment = (df['sentiment_numeric'] * df['confidence']).sum() / df['confidence'].sum() # Weighted average
-                avg_confidence = df['confidence'].mean()
-
-                # Store in DB
+                data = decode(body, properties)
+                metadata = {k: v for k, v in data.items() if k not in ('results', 'chunk_idx', 'chunk_count')}
+
+                # Aggregate Interval; skipped items had nothing to analyze and are left out.
+                # Chunked intervals are summed in Redis and finalized by whichever chunk arrives last;
+                # messages without chunk fields are a whole interval
+                partials = payload_partials(data['results'])
+                chunk_count = data.get('chunk_count', 1)
+                if chunk_count > 1:
+                    chunk_partials = partials
+                    partials = add_chunk(redis_client, metadata['job_id'], metadata['interval_timestamp'], data['chunk_idx'], chunk_count, chunk_partials)
+                    if partials is None:
+                        ch.basic_ack(delivery_tag=method.delivery_tag)
+                        logger.info("Chunk stored or interval already finalized", metadata=metadata, chunk_idx=data['chunk_idx'], chunk_count=chunk_count)
+                        return
+                    finalized_chunk = (data['chunk_idx'], chunk_partials)
+
+                interval = finalize_interval(*partials)
+                if interval is None:
+                    finalized_chunk = None
+                    if chunk_count > 1:
+                        discard_chunks(metadata)
+                    ch.basic_ack(delivery_tag=method.delivery_tag)
+                    logger.info("No scored comments in interval, nothing to aggregate", metadata=metadata)
+                    return
+                avg_sentiment, avg_confidence = interval
+
+                # Store in DB, folding the interval into the job rollup in the same transaction
                 interval_result = IntervalResultDB(
                     job_id=metadata['job_id'],
                     timestamp=datetime.fromisoformat(metadata['interval_timestamp']),
@@ -85,24 +161,42 @@ def run_consumer():
                     avg_confidence=avg_confidence,
                 )
                 db.add(interval_result)
+                rollup = update_job_rollup(db, metadata['job_id'], avg_sentiment, avg_confidence)
+                overall_sentiment = rollup.sentiment_mean
+                overall_confidence = rollup.confidence_sum / rollup.interval_count
+                overall_ci = mean_confidence_interval(rollup.interval_count, rollup.sentiment_mean, rollup.sentiment_m2)
                 db.commit()
-                
-                sentiment = db.query(IntervalResultDB).filter(IntervalResultDB.job_id == metadata['job_id']).all()
-                overall_sentiment = sum([s.avg_sentiment for s in sentiment]) / len(sentiment)
-                overall_confidence = sum([s.avg_confidence for s in sentiment]) / len(sentiment)
+                finalized_chunk = None
+                if chunk_count > 1:
+                    discard_chunks(metadata)
+                try:
+                    pipe = redis_client.pipeline()
+                    pipe.incr(summary_generation_key(metadata['job_id']))
+                    pipe.expire(summary_generation_key(metadata['job_id']), SUMMARY_GENERATION_TTL_SECONDS)
+                    pipe.execute()
+                except RedisError as e:
+                    logger.warning("Summary cache invalidation failed", job_id=metadata['job_id'], error=str(e))
 
                 # Publish to Notification
                 payload = {**metadata, 'aggregate': Aggregate(
                     interval_sentiment=avg_sentiment,
                     interval_confidence=avg_confidence,
                     overall_sentiment=overall_sentiment,
-                    overall_confidence=overall_confidence
+                    overall_confidence=overall_confidence,
+                    overall_ci=overall_ci
                 ).model_dump()}
-                ch.basic_publish(exchange='', routing_key="notification_queue", body=json.dumps(payload))
+                body, properties = encode(payload)
+                ch.basic_publish(exchange='', routing_key="notification_queue", body=body, properties=properties)
                 ch.basic_ack(delivery_tag=method.delivery_tag)
                 logger.info("Aggregated and published", metadata=metadata)
             except Exception as e:
                 logger.error("Aggregation failed", error=str(e))
+                if finalized_chunk is not None:
+                    # Hand the interval back so the redelivered chunk finalizes it again
+                    try:
+                        release_chunk(redis_client, metadata['job_id'], metadata['interval_timestamp'], *finalized_chunk)
+                    except RedisError as release_error:
+                        logger.error("Releasing finalized chunk failed", metadata=metadata, error=str(release_error))
                 ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
             finally:
                 db.close()
@@ -0,0 +1,77 @@
+import os
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+from redis import Redis
+
+load_dotenv()
+CHUNK_STATE_TTL_SECONDS = int(os.getenv("CHUNK_STATE_TTL_SECONDS", "86400"))
+
+# KEYS: received chunk indexes (set), partial sums (hash), finalized marker
+# ARGV: chunk_idx, chunk_count, weighted_sum, confidence_sum, count, ttl
+# A redelivered chunk is already in the set and is not added twice. Only the call whose chunk
+# completes the set gets {received, weighted_sum, confidence_sum, count} back, and it marks the
+# interval finalized so chunks redelivered later, even after clear_chunks, return just {received}.
+ADD_CHUNK_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return {redis.call('SCARD', KEYS[1])}
+end
+local added = redis.call('SADD', KEYS[1], ARGV[1])
+if added == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[2], 'weighted_sum', ARGV[3])
+    redis.call('HINCRBYFLOAT', KEYS[2], 'confidence_sum', ARGV[4])
+    redis.call('HINCRBY', KEYS[2], 'count', ARGV[5])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+local received = redis.call('SCARD', KEYS[1])
+if added == 0 or received < tonumber(ARGV[2]) then
+    return {received}
+end
+redis.call('SET', KEYS[3], 1, 'EX', ARGV[6])
+return {received, unpack(redis.call('HMGET', KEYS[2], 'weighted_sum', 'confidence_sum', 'count'))}
+"""
+
+# KEYS: as ADD_CHUNK_SCRIPT; ARGV: chunk_idx, weighted_sum, confidence_sum, count (already negated)
+# Takes a chunk back out and clears the finalized marker, so its redelivery completes the set again.
+RELEASE_CHUNK_SCRIPT = """
+if redis.call('SREM', KEYS[1], ARGV[1]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[2], 'weighted_sum', ARGV[2])
+    redis.call('HINCRBYFLOAT', KEYS[2], 'confidence_sum', ARGV[3])
+    redis.call('HINCRBY', KEYS[2], 'count', ARGV[4])
+end
+redis.call('DEL', KEYS[3])
+"""
+
+def chunk_keys(job_id: str, interval_timestamp: str) -> Tuple[str, str]:
+    prefix = f"vibesense:chunks:{job_id}:{interval_timestamp}"
+    return f"{prefix}:received", f"{prefix}:partials"
+
+def finalized_key(job_id: str, interval_timestamp: str) -> str:
+    return f"vibesense:chunks:{job_id}:{interval_timestamp}:finalized"
+
+def add_chunk(client: Redis, job_id: str, interval_timestamp: str, chunk_idx: int, chunk_count: int,
+              partials: Tuple[float, float, int]) -> Optional[Tuple[float, float, int]]:
+    """
+    Folds one chunk's interval_partials() into the interval's running sums. Returns the
+    combined partials to the one call whose chunk completes the interval, otherwise None.
+    """
+    weighted_sum, confidence_sum, count = partials
+    reply = client.register_script(ADD_CHUNK_SCRIPT)(
+        keys=[*chunk_keys(job_id, interval_timestamp), finalized_key(job_id, interval_timestamp)],
+        args=[chunk_idx, chunk_count, repr(float(weighted_sum)), repr(float(confidence_sum)), int(count), CHUNK_STATE_TTL_SECONDS]
+    )
+    if len(reply) == 1:
+        return None
+    return float(reply[1]), float(reply[2]), int(reply[3])
+
+def release_chunk(client: Redis, job_id: str, interval_timestamp: str, chunk_idx: int, partials: Tuple[float, float, int]):
+    """Undoes add_chunk for a chunk whose interval could not be stored, so it can be retried."""
+    weighted_sum, confidence_sum, count = partials
+    client.register_script(RELEASE_CHUNK_SCRIPT)(
+        keys=[*chunk_keys(job_id, interval_timestamp), finalized_key(job_id, interval_timestamp)],
+        args=[chunk_idx, repr(-float(weighted_sum)), repr(-float(confidence_sum)), -int(count)]
+    )
+
+def clear_chunks(client: Redis, job_id: str, interval_timestamp: str):
+    """Drops an interval's chunk state once its result is stored. The finalized marker stays until it expires."""
+    client.delete(*chunk_keys(job_id, interval_timestamp))
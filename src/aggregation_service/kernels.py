@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+# Sentiment labels on the 0 (negative) .. 2 (positive) scale used for every average
+LABEL_CODES = {
+    'Very Negative': 0,
+    'Negative': 0,
+    'Neutral': 1,
+    'Positive': 2,
+    'Very Positive': 2
+}
+
+def to_columns(results: Union[List[Dict], Dict[str, List]]) -> Tuple[Sequence[str], Sequence[float], Sequence[bool]]:
+    """
+    Returns (sentiments, confidences, skipped) from either payload layout: a list of
+    AnalysisOutput dicts or a columnar dict of lists.
+    """
+    if isinstance(results, dict):
+        sentiments = results['sentiment']
+        return sentiments, results['confidence'], results.get('skipped') or [False] * len(sentiments)
+    return [r['sentiment'] for r in results], [r['confidence'] for r in results], [r.get('skipped', False) for r in results]
+
+def encode_labels(sentiments: Sequence[str]) -> np.ndarray:
+    """Label codes as floats; unknown labels become NaN and are left out of the aggregates."""
+    return np.fromiter((LABEL_CODES.get(s, np.nan) for s in sentiments), dtype=np.float64, count=len(sentiments))
+
+def interval_partials(codes: np.ndarray, confidences: np.ndarray, skipped: Optional[np.ndarray] = None) -> Tuple[float, float, int]:
+    """
+    Returns (sum of code * confidence, sum of confidence, count) over the scored items,
+    which combine across chunks by plain addition.
+    """
+    mask = ~np.isnan(codes)
+    if skipped is not None:
+        mask &= ~skipped
+    codes, confidences = codes[mask], confidences[mask]
+    return float(np.dot(codes, confidences)), float(confidences.sum()), int(mask.sum())
+
+def finalize_interval(weighted_sum: float, confidence_sum: float, count: int) -> Optional[Tuple[float, float]]:
+    """Confidence-weighted mean sentiment and mean confidence, or None if nothing was scored."""
+    if count == 0 or confidence_sum == 0:
+        return None
+    return weighted_sum / confidence_sum, confidence_sum / count
+
+def payload_partials(results: Union[List[Dict], Dict[str, List]]) -> Tuple[float, float, int]:
+    """interval_partials() of one message's results, in either payload layout."""
+    sentiments, confidences, skipped = to_columns(results)
+    return interval_partials(
+        encode_labels(sentiments),
+        np.asarray(confidences, dtype=np.float64),
+        np.asarray(skipped, dtype=bool)
+    )
+
+def aggregate_interval(results: Union[List[Dict], Dict[str, List]]) -> Optional[Tuple[float, float]]:
+    """(avg_sentiment, avg_confidence) for one interval's results, or None if nothing was scored."""
+    return finalize_interval(*payload_partials(results))
@@ -1,31 +1,90 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from dotenv import load_dotenv
 import os
 import pika
-import json
-from transformers import pipeline
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import structlog
 from src.models import AnalysisOutput
+from src.ai_service.batching import length_sorted_order, restore_order
+from src.ai_service.backends import load_sentiment_pipeline, MODEL_NAME, AI_BACKEND
+from src.ai_service.result_cache import SentimentCache
+from src.ai_service.fast_path import classify_trivial
+from src.ai_service.coalescer import InferenceCoalescer, CoalescerOverloaded
+from src.ai_service.message_batch import process_batch
+from src.ai_service.supervisor import supervise
+from redis import Redis
+from src.codec import encode, decode
 
 load_dotenv()
 RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+AI_PREFETCH_COUNT = int(os.getenv("AI_PREFETCH_COUNT", "256"))
+AI_MAX_BATCH_COMMENTS = int(os.getenv("AI_MAX_BATCH_COMMENTS", "512"))
+AI_MAX_BATCH_WAIT_SECONDS = float(os.getenv("AI_MAX_BATCH_WAIT_SECONDS", "0.5"))
+AI_INFERENCE_BATCH_SIZE = int(os.getenv("AI_INFERENCE_BATCH_SIZE", "64"))
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "100000"))
+AI_CACHE_REDIS_URL = os.getenv("AI_CACHE_REDIS_URL")  # optional shared tier
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+AI_HTTP_MAX_BATCH_COMMENTS = int(os.getenv("AI_HTTP_MAX_BATCH_COMMENTS", "256"))
+AI_HTTP_MAX_BATCH_WAIT_SECONDS = float(os.getenv("AI_HTTP_MAX_BATCH_WAIT_SECONDS", "0.02"))
+AI_HTTP_MAX_PENDING_REQUESTS = int(os.getenv("AI_HTTP_MAX_PENDING_REQUESTS", "1000"))
+AI_HTTP_TIMEOUT_SECONDS = float(os.getenv("AI_HTTP_TIMEOUT_SECONDS", "10"))
+AI_WORKERS = int(os.getenv("AI_WORKERS", "1"))
+AI_TORCH_THREADS_PER_WORKER = int(os.getenv("AI_TORCH_THREADS_PER_WORKER", "0"))  # 0 = CPUs / workers
+AI_PIN_CPUS = os.getenv("AI_PIN_CPUS", "false").lower() == "true"
 
-app = FastAPI(title="AI Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_coalescer.start()
+    yield
+    await http_coalescer.stop()
+
+app = FastAPI(title="AI Service", lifespan=lifespan)
 logger = structlog.get_logger()
 
 # Load Models
-sentiment_pipe = pipeline(
-    "sentiment-analysis",
-    model="tabularisai/multilingual-sentiment-analysis"
+sentiment_pipe = load_sentiment_pipeline()
+result_cache = SentimentCache(
+    model_version=f"{MODEL_NAME}:{AI_BACKEND}",
+    max_entries=AI_CACHE_SIZE,
+    redis_client=Redis.from_url(AI_CACHE_REDIS_URL) if AI_CACHE_REDIS_URL else None,
+    ttl_seconds=AI_CACHE_TTL_SECONDS
+)
+
+# Inference for HTTP callers runs on a dedicated thread so the event loop stays responsive
+inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+http_coalescer = InferenceCoalescer(
+    lambda texts: process_comments(texts),
+    inference_executor,
+    max_batch=AI_HTTP_MAX_BATCH_COMMENTS,
+    max_wait=AI_HTTP_MAX_BATCH_WAIT_SECONDS,
+    max_pending=AI_HTTP_MAX_PENDING_REQUESTS
 )
 
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
 # API Endpoint for Sync Testing
 @app.post("/analyze/", response_model=List[AnalysisOutput])
 async def analyze_text(texts: List[str]):
     """Process text comments for sentiment."""
-    return process_comments(texts)
+    try:
+        return await http_coalescer.submit(texts, timeout=AI_HTTP_TIMEOUT_SECONDS)
+    except CoalescerOverloaded:
+        raise HTTPException(status_code=429, detail="Too many pending analysis requests", headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Analysis did not complete within the deadline", headers={"Retry-After": "5"})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the sentiment result cache in this process."""
+    return result_cache.stats()
 
 # Queue Consumer (Run in Worker Process)
 def run_consumer():
@@ -36,44 +95,123 @@ def run_consumer():
         channel = connection.channel()
         channel.queue_declare(queue="analysis_queue", durable=True)
         channel.queue_declare(queue="aggregation_queue", durable=True)
+        channel.basic_qos(prefetch_count=AI_PREFETCH_COUNT)
+
+        def publish_results(ch, method, data, results):
+            """Publish one message's results and ack it, so a later failure cannot republish them."""
+            metadata = {k: v for k, v in data.items() if k != 'comments'}
+            body, properties = encode({**metadata, 'results': to_columnar(results)})
+            ch.basic_publish(exchange='', routing_key="aggregation_queue", body=body, properties=properties)
+            ch.basic_ack(delivery_tag=method.delivery_tag)
 
-        def callback(ch, method, properties, body):
-            try:
-                data = json.loads(body)
-                comments = data['comments']  # List of texts
-                metadata = {k: v for k, v in data.items() if k != 'comments'}
-                results = process_comments(comments)
-                payload = {**metadata, 'results': [r.model_dump() for r in results]}
-                ch.basic_publish(exchange='', routing_key="aggregation_queue", body=json.dumps(payload))
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                logger.info("Comments processed and published", metadata=metadata)
-            except Exception as e:
-                logger.error("Processing failed", error=str(e))
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-
-        channel.basic_consume(queue="analysis_queue", on_message_callback=callback)
         logger.info("AI Consumer started")
-        channel.start_consuming()
+        pending = []
+        pending_comments = 0
+        deadline = None
+        # inactivity_timeout makes consume() yield (None, None, None) when the queue goes quiet,
+        # so a partial batch is flushed at most about two wait periods after its first message
+        for method, properties, body in channel.consume("analysis_queue", inactivity_timeout=AI_MAX_BATCH_WAIT_SECONDS):
+            if method is not None:
+                try:
+                    data = decode(body, properties)
+                    if not isinstance(data, dict) or not isinstance(data.get('comments'), list):
+                        raise ValueError("message has no comments list")
+                except ValueError as e:
+                    logger.error("Discarding malformed message", error=str(e))
+                    channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                    continue
+                if not pending:
+                    deadline = time.monotonic() + AI_MAX_BATCH_WAIT_SECONDS
+                pending.append((method, data))
+                pending_comments += len(data['comments'])
+            if pending and (pending_comments >= AI_MAX_BATCH_COMMENTS or method is None or time.monotonic() >= deadline):
+                if process_batch(channel, pending, process_comments, publish_results):
+                    logger.info("Comments processed and published", messages=len(pending), comments=pending_comments, cache=result_cache.stats())
+                pending = []
+                pending_comments = 0
 
     consume()
 
+def to_columnar(results: List[AnalysisOutput]) -> dict:
+    """Results as parallel lists, so the aggregation consumer can skip per-row parsing."""
+    return {
+        'sentiment': [r.sentiment for r in results],
+        'confidence': [r.confidence for r in results],
+        'skipped': [r.skipped for r in results],
+    }
+
+def _infer(texts: List[str]) -> List[dict]:
+    """Run the model over texts, sorted by token length so each batch pads to a similar length."""
+    lengths = [len(ids) for ids in sentiment_pipe.tokenizer(texts, truncation=True)["input_ids"]]
+    order = length_sorted_order(lengths)
+    sorted_results = sentiment_pipe([texts[i] for i in order], batch_size=AI_INFERENCE_BATCH_SIZE, truncation=True)
+    return [{'label': r['label'], 'score': r['score']} for r in restore_order(sorted_results, order)]
+
 def process_comments(texts: List[str]) -> List[AnalysisOutput]:
     """Process comments with AI model."""
+    if not texts:
+        return []
     try:
-        sent_results = sentiment_pipe(texts, batch_size=64, truncation=True)
-        outputs = []
-        for sent in sent_results:
-            output = AnalysisOutput(
+        # Empty and trivial texts are resolved by rule; the rest go through the cache
+        outputs = [classify_trivial(text) for text in texts]
+        pending = [i for i, output in enumerate(outputs) if output is None]
+        if not pending:
+            return outputs
+
+        # Only texts missing from the cache reach the model, each distinct text once
+        keys = [result_cache.key(texts[i]) for i in pending]
+        results = dict(zip(keys, result_cache.get_many(keys)))
+        missing = {key: texts[i] for key, i in zip(keys, pending) if results[key] is None}
+        if missing:
+            fresh = dict(zip(missing.keys(), _infer(list(missing.values()))))
+            result_cache.set_many(fresh)
+            results.update(fresh)
+
+        for i, key in zip(pending, keys):
+            outputs[i] = AnalysisOutput(
                 text="",
-                sentiment=sent['label'],
-                confidence=sent['score'],
+                sentiment=results[key]['label'],
+                confidence=results[key]['score'],
             )
-            outputs.append(output)
         return outputs
     except Exception as e:
         logger.error("AI processing failed", error=str(e))
         raise
 
+def run_supervisor(num_workers: int, threads_per_worker: int):
+    """
+    Fork num_workers consumers from this process after the model is loaded, so they share its
+    weights copy-on-write. An ONNX Runtime session does not survive fork(), so with that backend
+    each worker builds its own session (the parent's load still does the export and caching).
+    """
+    import torch
+
+    inherited = []
+
+    def worker_main(index: int):
+        global sentiment_pipe
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"
+        torch.set_num_threads(threads_per_worker)
+        if AI_PIN_CPUS and hasattr(os, "sched_setaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+            start = (index * threads_per_worker) % len(cpus)
+            os.sched_setaffinity(0, {cpus[(start + i) % len(cpus)] for i in range(threads_per_worker)})
+        if AI_BACKEND == "onnx":
+            # The inherited session's thread pool did not come along; keep the object alive so
+            # its destructor never waits on those threads, and build a fresh session here
+            inherited.append(sentiment_pipe)
+            sentiment_pipe = load_sentiment_pipeline(onnx_threads=threads_per_worker)
+        logger.info("AI worker ready", worker=index, threads=threads_per_worker)
+        run_consumer()
+
+    supervise(num_workers, worker_main)
+
 if __name__ == "__main__":
-    # For running the consumer worker: python3 src/ai_service/app.py
-    run_consumer()
\ No newline at end of file
+    # For running the consumer worker: python3 src/ai_service/app.py [--workers N]
+    parser = argparse.ArgumentParser(description="AI service queue consumer")
+    parser.add_argument("--workers", type=int, default=AI_WORKERS, help="consumer processes forked after the model loads")
+    args = parser.parse_args()
+    if args.workers > 1:
+        run_supervisor(args.workers, AI_TORCH_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // args.workers))
+    else:
+        run_consumer()
\ No newline at end of file
@@ -0,0 +1,41 @@
+import os
+from dotenv import load_dotenv
+from transformers import AutoTokenizer, pipeline
+
+load_dotenv()
+MODEL_NAME = "tabularisai/multilingual-sentiment-analysis"
+AI_BACKEND = os.getenv("AI_BACKEND", "torch")  # "torch", "quantized" or "onnx"
+AI_ONNX_MODEL_DIR = os.getenv("AI_ONNX_MODEL_DIR")  # exported model is cached here if set
+
+def load_sentiment_pipeline(backend: str = AI_BACKEND, model_name: str = MODEL_NAME, onnx_threads: int = 0):
+    """
+    Builds the sentiment-analysis pipeline on a CPU backend.
+    "torch" is the stock PyTorch model, "quantized" applies dynamic int8 quantization to its
+    Linear layers, and "onnx" runs an ONNX export through ONNX Runtime (needs optimum[onnxruntime]);
+    onnx_threads sets its intra-op thread pool size (0 lets ONNX Runtime decide).
+    """
+    if backend == "torch":
+        return pipeline("sentiment-analysis", model=model_name)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "quantized":
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+    if backend == "onnx":
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = onnx_threads
+        if AI_ONNX_MODEL_DIR and os.path.isdir(AI_ONNX_MODEL_DIR):
+            model = ORTModelForSequenceClassification.from_pretrained(AI_ONNX_MODEL_DIR, session_options=session_options)
+        else:
+            model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True, session_options=session_options)
+            if AI_ONNX_MODEL_DIR:
+                model.save_pretrained(AI_ONNX_MODEL_DIR)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+    raise ValueError(f"Unknown inference backend: {backend}")
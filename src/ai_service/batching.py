@@ -0,0 +1,23 @@
+from typing import List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+def length_sorted_order(lengths: Sequence[int]) -> List[int]:
+    """
+    Returns indices ordering inputs by token length, so each inference batch holds
+    similarly sized texts and pads less.
+    """
+    return sorted(range(len(lengths)), key=lengths.__getitem__)
+
+def restore_order(items: Sequence[T], order: Sequence[int]) -> List[T]:
+    """Inverse of applying `order`: items[j] was produced for input order[j]."""
+    restored: List[Optional[T]] = [None] * len(items)
+    for position, index in enumerate(order):
+        restored[index] = items[position]
+    return restored
+
+def padded_tokens(lengths: Sequence[int], batch_size: int, order: Optional[Sequence[int]] = None) -> int:
+    """Total tokens the model processes when every batch is padded to its longest member."""
+    if order is not None:
+        lengths = [lengths[i] for i in order]
+    return sum(max(lengths[i:i + batch_size]) * len(lengths[i:i + batch_size]) for i in range(0, len(lengths), batch_size))
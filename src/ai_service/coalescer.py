@@ -0,0 +1,78 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, List, Optional
+
+class CoalescerOverloaded(Exception):
+    """Raised when the admission queue is full."""
+
+class InferenceCoalescer:
+    """
+    Merges concurrent inference requests into shared batches run on an executor, so the
+    event loop never blocks on the model. A batch closes when it holds max_batch texts or
+    max_wait seconds after its first request; at most max_pending requests may wait.
+    """
+
+    def __init__(self, infer: Callable[[List[str]], list], executor: Executor, max_batch: int = 256, max_wait: float = 0.02, max_pending: int = 1000):
+        self._infer = infer
+        self._executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, texts: List[str], timeout: float) -> list:
+        """Queues texts for the next batch; raises asyncio.TimeoutError if not served within timeout."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((texts, future))
+        except asyncio.QueueFull:
+            raise CoalescerOverloaded()
+        # A timed-out request cancels its future and is dropped from the batch if not yet started
+        return await asyncio.wait_for(future, timeout)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            batch = [(texts, future) for texts, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self._infer, [text for texts, _ in batch for text in texts])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for texts, future in batch:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(texts)])
+                offset += len(texts)
@@ -0,0 +1,79 @@
+import unicodedata
+from typing import Optional
+from src.models import AnalysisOutput
+
+# Tokens whose sentiment is unambiguous on their own, with the confidence reported for them.
+# Texts arrive preprocessed (lowercased, stop words and punctuation removed).
+TRIVIAL_LABELS = {
+    "love": ("Very Positive", 0.9),
+    "loved": ("Very Positive", 0.9),
+    "awesome": ("Very Positive", 0.9),
+    "amazing": ("Very Positive", 0.9),
+    "great": ("Positive", 0.85),
+    "nice": ("Positive", 0.85),
+    "cool": ("Positive", 0.8),
+    "beautiful": ("Positive", 0.85),
+    "lol": ("Positive", 0.7),
+    "lmao": ("Positive", 0.7),
+    "wow": ("Positive", 0.7),
+    "meh": ("Neutral", 0.7),
+    "boring": ("Negative", 0.85),
+    "cringe": ("Negative", 0.85),
+    "trash": ("Very Negative", 0.85),
+    "terrible": ("Very Negative", 0.9),
+    "awful": ("Very Negative", 0.9),
+    "hate": ("Very Negative", 0.9),
+    "❤": ("Very Positive", 0.9),
+    "😍": ("Very Positive", 0.9),
+    "🥰": ("Very Positive", 0.9),
+    "🔥": ("Very Positive", 0.85),
+    "💯": ("Very Positive", 0.85),
+    "🙌": ("Positive", 0.85),
+    "👏": ("Positive", 0.85),
+    "👍": ("Positive", 0.85),
+    "😂": ("Positive", 0.75),
+    "🤣": ("Positive", 0.75),
+    "😊": ("Positive", 0.85),
+    "🙂": ("Positive", 0.7),
+    "😐": ("Neutral", 0.7),
+    "🤔": ("Neutral", 0.7),
+    "😢": ("Negative", 0.8),
+    "😭": ("Negative", 0.6),
+    "👎": ("Negative", 0.85),
+    "😡": ("Very Negative", 0.85),
+    "🤮": ("Very Negative", 0.85),
+    "💩": ("Very Negative", 0.8),
+}
+
+# Emoji presentation selectors, skin tones and joiners carry no sentiment of their own
+_EMOJI_MODIFIERS = {"\ufe0f", "\ufe0e", "\u200d"} | {chr(c) for c in range(0x1F3FB, 0x1F400)}
+
+def _is_emoji(token: str) -> bool:
+    return all(unicodedata.category(ch) in ("So", "Sk") or ch in _EMOJI_MODIFIERS for ch in token)
+
+def _tokens(text: str) -> list:
+    tokens = []
+    for token in text.split():
+        if token.startswith("@"):
+            continue  # mentions say nothing about sentiment
+        if _is_emoji(token):
+            # emoji runs may arrive unsplit ("🔥🔥🔥"); look them up one symbol at a time
+            tokens.extend(ch for ch in token if ch not in _EMOJI_MODIFIERS)
+        else:
+            tokens.append(token)
+    return tokens
+
+def classify_trivial(text: str) -> Optional[AnalysisOutput]:
+    """
+    Resolves texts the model adds nothing to. Texts with nothing left to analyze are marked skipped;
+    texts made only of lookup-table tokens that agree on a label get that label. Anything else
+    returns None and goes to the model.
+    """
+    tokens = _tokens(text)
+    if not tokens:
+        return AnalysisOutput(text="", sentiment="Neutral", confidence=0.0, skipped=True)
+
+    entries = [TRIVIAL_LABELS.get(token.lower()) for token in tokens]
+    if all(entries) and len({label for label, _ in entries}) == 1:
+        return AnalysisOutput(text="", sentiment=entries[0][0], confidence=min(confidence for _, confidence in entries))
+    return None
@@ -0,0 +1,38 @@
+from typing import Callable, List, Sequence, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+def process_batch(ch, messages: Sequence[Tuple[object, dict]], analyze: Callable[[List[str]], list],
+                  publish: Callable[[object, object, dict, list], None]) -> bool:
+    """
+    Runs one analyze() call over the comments of many (method, data) messages and hands each
+    message its slice of the results through publish(ch, method, data, results), which acks it.
+    If the batched call fails, every message is retried on its own. One that fails again is
+    requeued on first delivery, since the failure may be transient, and dropped once redelivered.
+    Returns True if the batched call succeeded.
+    """
+    texts = [comment for _, data in messages for comment in data['comments']]
+    try:
+        results = analyze(texts)
+    except Exception as e:
+        logger.warning("Batched inference failed, retrying messages one by one", messages=len(messages), error=str(e))
+        for method, data in messages:
+            try:
+                message_results = analyze(data['comments'])
+            except Exception as e:
+                if method.redelivered:
+                    logger.error("Processing failed again after redelivery, discarding message", error=str(e))
+                else:
+                    logger.error("Processing failed, requeueing message", error=str(e))
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=not method.redelivered)
+                continue
+            publish(ch, method, data, message_results)
+        return False
+
+    offset = 0
+    for method, data in messages:
+        count = len(data['comments'])
+        publish(ch, method, data, results[offset:offset + count])
+        offset += count
+    return True
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from redis import Redis
+from redis.exceptions import RedisError
+import structlog
+
+logger = structlog.get_logger()
+
+def normalize_text(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+class SentimentCache:
+    """
+    Model outputs keyed by a hash of the normalized text and the model version.
+    Lookups hit an in-process LRU first, then the optional shared Redis tier.
+    """
+
+    def __init__(self, model_version: str, max_entries: int = 100_000, redis_client: Optional[Redis] = None, ttl_seconds: int = 7 * 24 * 3600):
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self._local: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model_version}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+        return f"vibesense:sentiment:{digest}"
+
+    def get_many(self, keys: List[str]) -> List[Optional[Dict]]:
+        """Returns the cached result for each key, or None on a miss."""
+        with self._lock:
+            found = []
+            for key in keys:
+                result = self._local.get(key)
+                if result is not None:
+                    self._local.move_to_end(key)
+                found.append(result)
+
+        absent = [i for i, result in enumerate(found) if result is None]
+        promoted = {}
+        if absent and self.redis_client is not None:
+            try:
+                shared = self.redis_client.mget([keys[i] for i in absent])
+            except RedisError as e:
+                logger.warning("Shared sentiment cache unavailable", error=str(e))
+                shared = [None] * len(absent)
+            for i, raw in zip(absent, shared):
+                if raw is not None:
+                    found[i] = promoted[keys[i]] = json.loads(raw)
+            self._store_local(promoted)
+
+        with self._lock:
+            self.local_hits += len(keys) - len(absent)
+            self.shared_hits += sum(found[i] is not None for i in absent)
+            self.misses += sum(found[i] is None for i in absent)
+        return found
+
+    def set_many(self, results: Dict[str, Dict]):
+        self._store_local(results)
+        if results and self.redis_client is not None:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, result in results.items():
+                    pipe.set(key, json.dumps(result), ex=self.ttl_seconds)
+                pipe.execute()
+            except RedisError as e:
+                logger.warning("Shared sentiment cache unavailable", error=str(e))
+
+    def _store_local(self, results: Dict[str, Dict]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, result in results.items():
+                self._local[key] = result
+                self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
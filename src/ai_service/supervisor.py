@@ -0,0 +1,95 @@
+import gc
+import os
+import signal
+import time
+from typing import Callable, Dict
+from dotenv import load_dotenv
+import structlog
+
+load_dotenv()
+AI_WORKER_RESTART_MAX_DELAY_SECONDS = float(os.getenv("AI_WORKER_RESTART_MAX_DELAY_SECONDS", "60"))
+
+# Restart delay doubles with each quick crash of the same worker, and resets once it has stayed up this long
+WORKER_STABLE_SECONDS = 60
+# Longest the reaping loop sleeps between checks, which bounds how late a restart or a shutdown is noticed
+POLL_INTERVAL_SECONDS = 0.2
+
+logger = structlog.get_logger()
+
+def restart_delay(crashes: int) -> float:
+    """Seconds to wait before restarting a worker that has crashed `crashes` times in a row before."""
+    return min(AI_WORKER_RESTART_MAX_DELAY_SECONDS, 2 ** crashes - 1)
+
+def supervise(num_workers: int, worker_main: Callable[[int], None]):
+    """
+    Forks num_workers children that each run worker_main(index) and restarts any that dies,
+    with exponential backoff, until SIGTERM/SIGINT, which is forwarded to the children.
+    Restarts are kept as deadlines rather than slept on, so dead workers keep being reaped
+    and a shutdown is acted on within POLL_INTERVAL_SECONDS.
+    """
+    # Move everything allocated so far out of the collector's reach; otherwise the first
+    # collection in each worker touches every object header and un-shares those pages
+    gc.collect()
+    gc.freeze()
+
+    workers: Dict[int, int] = {}
+    started_at: Dict[int, float] = {}
+    crashes: Dict[int, int] = {}
+    restart_at: Dict[int, float] = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            status = 0
+            try:
+                worker_main(index)
+            except BaseException as e:
+                logger.error("AI worker exited", worker=index, error=str(e))
+                status = 1
+            os._exit(status)
+        workers[pid] = index
+        started_at[index] = time.monotonic()
+        logger.info("AI worker started", worker=index, pid=pid)
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        restart_at.clear()
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for index in range(num_workers):
+        spawn(index)
+
+    while workers or restart_at:
+        now = time.monotonic()
+        for index, at in list(restart_at.items()):
+            if at <= now and not stopping:
+                del restart_at[index]
+                spawn(index)
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            # No children left at all; only pending restarts keep the loop going
+            workers.clear()
+            pid = 0
+        if pid == 0:
+            if workers or restart_at:
+                time.sleep(POLL_INTERVAL_SECONDS)
+            continue
+
+        index = workers.pop(pid, None)
+        if index is None or stopping:
+            continue
+        if time.monotonic() - started_at[index] >= WORKER_STABLE_SECONDS:
+            crashes[index] = 0
+        delay = restart_delay(crashes.get(index, 0))
+        crashes[index] = crashes.get(index, 0) + 1
+        restart_at[index] = time.monotonic() + delay
+        logger.warning("AI worker died, restarting", worker=index, pid=pid, status=status, delay_seconds=delay)
@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+from typing import Any, Optional, Tuple
+from dotenv import load_dotenv
+import pika
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # gzip only
+    zstandard = None
+
+load_dotenv()
+MESSAGE_FORMAT = os.getenv("MESSAGE_FORMAT", "msgpack")  # "msgpack" or "json"
+MESSAGE_COMPRESSION = os.getenv("MESSAGE_COMPRESSION", "zstd")  # "zstd", "gzip" or "none"
+MESSAGE_COMPRESSION_THRESHOLD = int(os.getenv("MESSAGE_COMPRESSION_THRESHOLD", "4096"))  # bytes
+
+CODEC_VERSION = 1
+CODEC_VERSION_HEADER = "x-codec-version"
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+class CodecError(ValueError):
+    """Raised for message bodies that cannot be decoded."""
+
+def encode(payload: Any, message_format: str = MESSAGE_FORMAT, compression: str = MESSAGE_COMPRESSION,
+           threshold: int = MESSAGE_COMPRESSION_THRESHOLD) -> Tuple[bytes, pika.BasicProperties]:
+    """
+    Serializes a queue payload and returns it with the AMQP properties that describe it.
+    Falls back to JSON and gzip when msgpack or zstandard are not installed.
+    """
+    if message_format == "msgpack" and msgpack is not None:
+        body, content_type = msgpack.packb(payload, use_bin_type=True), MSGPACK_CONTENT_TYPE
+    else:
+        body, content_type = json.dumps(payload).encode("utf-8"), JSON_CONTENT_TYPE
+
+    content_encoding = None
+    if compression != "none" and len(body) >= threshold:
+        if compression == "zstd" and zstandard is not None:
+            body, content_encoding = zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+        else:
+            body, content_encoding = gzip.compress(body, compresslevel=6), "gzip"
+
+    properties = pika.BasicProperties(
+        content_type=content_type,
+        content_encoding=content_encoding,
+        headers={CODEC_VERSION_HEADER: CODEC_VERSION}
+    )
+    return body, properties
+
+def decode(body: bytes, properties: Optional[pika.BasicProperties] = None) -> Any:
+    """
+    Decodes a queue message from its AMQP properties. Messages without a content type are
+    treated as plain JSON, as published before the codec existed.
+    """
+    content_type = getattr(properties, 'content_type', None)
+    content_encoding = getattr(properties, 'content_encoding', None)
+    headers = getattr(properties, 'headers', None) or {}
+    if headers.get(CODEC_VERSION_HEADER, CODEC_VERSION) > CODEC_VERSION:
+        raise CodecError(f"Unsupported codec version {headers[CODEC_VERSION_HEADER]}")
+
+    try:
+        if content_encoding == "gzip":
+            body = gzip.decompress(body)
+        elif content_encoding == "zstd":
+            if zstandard is None:
+                raise CodecError("zstd-compressed message but zstandard is not installed")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif content_encoding:
+            raise CodecError(f"Unsupported content encoding {content_encoding}")
+
+        if content_type == MSGPACK_CONTENT_TYPE:
+            if msgpack is None:
+                raise CodecError("msgpack message but msgpack is not installed")
+            return msgpack.unpackb(body, raw=False)
+        if content_type in (None, JSON_CONTENT_TYPE):
+            return json.loads(body)
+        raise CodecError(f"Unsupported content type {content_type}")
+    except CodecError:
+        raise
+    except Exception as e:
+        raise CodecError(f"Malformed message body: {e}") from e
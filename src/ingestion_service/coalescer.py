@@ -0,0 +1,80 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from redis import Redis
+from redis.exceptions import LockError
+import structlog
+from src.ingestion_service.youtube_fetcher import fetch_comments
+
+load_dotenv()
+FETCH_COALESCE_WINDOW_SECONDS = int(os.getenv("FETCH_COALESCE_WINDOW_SECONDS", "60"))
+FETCH_LOCK_TIMEOUT_SECONDS = int(os.getenv("FETCH_LOCK_TIMEOUT_SECONDS", "120"))
+
+logger = structlog.get_logger()
+
+def _as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+def _read_cached(client: Redis, key: str, since: Optional[datetime]) -> Optional[Tuple[List[Dict], datetime]]:
+    """
+    Returns the cached comments newer than `since` and when they were fetched, or None if there
+    is no entry or the entry was fetched with a later watermark and so may be missing comments.
+    """
+    raw = client.get(key)
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    if 'fetched_at' not in entry:
+        return None
+    cached_since = _as_utc(datetime.fromisoformat(entry['since'])) if entry['since'] else None
+    if cached_since is not None and (since is None or since < cached_since):
+        return None
+    fetched_at = datetime.fromisoformat(entry['fetched_at'])
+    if since is None:
+        return entry['comments'], fetched_at
+    return [c for c in entry['comments'] if datetime.fromisoformat(c['published_at'].replace("Z", "+00:00")) > since], fetched_at
+
+def fetch_comments_coalesced(client: Redis, post_id: str, since: Optional[datetime] = None) -> Tuple[List[Dict], datetime]:
+    """
+    Fetches new comments for a post, sharing one upstream fetch between all jobs watching it.
+    The first caller within FETCH_COALESCE_WINDOW_SECONDS fetches under a per-post lock and
+    caches the result; concurrent and later callers wait on the lock and filter the cached
+    comments by their own watermark.
+    Also returns when the upstream fetch started: a cached result can be up to the window old,
+    so that, not the time of the call, is as far as the comments are known to be complete.
+    """
+    since = _as_utc(since)
+    if FETCH_COALESCE_WINDOW_SECONDS <= 0:
+        fetched_at = datetime.now(timezone.utc)
+        return fetch_comments(post_id, since=since), fetched_at
+
+    key = f"vibesense:fetch:{post_id}"
+    cached = _read_cached(client, key, since)
+    if cached is not None:
+        logger.info("Serving coalesced fetch from cache", post_id=post_id, comments=len(cached[0]))
+        return cached
+
+    lock = client.lock(f"{key}:lock", timeout=FETCH_LOCK_TIMEOUT_SECONDS, blocking_timeout=FETCH_LOCK_TIMEOUT_SECONDS)
+    acquired = lock.acquire()
+    try:
+        # Another job may have completed the fetch while we waited for the lock
+        cached = _read_cached(client, key, since)
+        if cached is not None:
+            logger.info("Serving coalesced fetch from cache", post_id=post_id, comments=len(cached[0]))
+            return cached
+
+        fetched_at = datetime.now(timezone.utc)
+        comments = fetch_comments(post_id, since=since)
+        entry = {'since': since.isoformat() if since else None, 'fetched_at': fetched_at.isoformat(), 'comments': comments}
+        client.set(key, json.dumps(entry), ex=FETCH_COALESCE_WINDOW_SECONDS)
+        return comments, fetched_at
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except LockError:
+                logger.warning("Fetch lock expired before release", post_id=post_id)
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Dict, Iterable, List
+from redis import Redis
+
+def seen_key(job_id: str) -> str:
+    return f"vibesense:seen:{job_id}"
+
+def filter_unseen(client: Redis, job_id: str, comments: List[Dict]) -> List[Dict]:
+    """
+    Drops comments whose comment_id was already published for this job, and duplicates within the batch.
+    """
+    unique = list({c['comment_id']: c for c in comments}.values())
+    if not unique:
+        return []
+    flags = client.smismember(seen_key(job_id), [c['comment_id'] for c in unique])
+    return [c for c, seen in zip(unique, flags) if not seen]
+
+def mark_seen(client: Redis, job_id: str, comment_ids: Iterable[str], expires_at: datetime):
+    """
+    Records comment IDs as published for this job. The index expires together with the job.
+    """
+    comment_ids = list(comment_ids)
+    if not comment_ids:
+        return
+    pipe = client.pipeline()
+    pipe.sadd(seen_key(job_id), *comment_ids)
+    pipe.expireat(seen_key(job_id), expires_at)
+    pipe.execute()
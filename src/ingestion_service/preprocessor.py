@@ -1,11 +1,72 @@
-import spacy
+import os
+import re
+from functools import lru_cache
+from typing import List
 
-nlp = spacy.load("en_core_web_sm")
+PREPROCESS_BACKEND = os.getenv("PREPROCESS_BACKEND", "model")  # "model", "tokenizer" or "regex"
+PREPROCESS_BATCH_SIZE = int(os.getenv("PREPROCESS_BATCH_SIZE", "256"))
+PREPROCESS_N_PROCESS = int(os.getenv("PREPROCESS_N_PROCESS", "1"))
 
-def preprocess_text(text: str) -> str:
+# Mirrors the spaCy English tokenizer exceptions that matter for the output: contractions
+# ("don't" -> "do", "n't"), "gonna"/"wanna"/"gotta", @mentions and numbers like 10/10 or 3:45
+TOKEN_PATTERN = re.compile(
+    r"\w+(?=n['’]t\b)|n['’]t\b|['’](?:s|m|d|ll|re|ve)\b"
+    r"|\b(?:gon|wan)(?=na\b)|\bgot(?=ta\b)|(?<=gon|wan)na\b|(?<=got)ta\b"
+    r"|@\w+|\d+(?:[.,:/]\d+)+|\w+|[^\w\s]",
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=None)
+def get_nlp(backend: str = PREPROCESS_BACKEND):
+    """
+    Loads the spaCy pipeline for a backend on first use.
+    "model" loads en_core_web_sm without its statistical components; "tokenizer" builds a blank
+    English pipeline, which has the same tokenizer and lexeme attributes but no model to load.
+    """
+    import spacy
+
+    if backend == "model":
+        # Stop-word, URL and punctuation flags are lexical attributes set by the tokenizer,
+        # so the statistical components are never needed.
+        return spacy.load("en_core_web_sm", exclude=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "ner"])
+    if backend == "tokenizer":
+        return spacy.blank("en")
+    raise ValueError(f"Unknown spaCy preprocessing backend: {backend}")
+
+@lru_cache(maxsize=None)
+def _lexical_rules():
+    from spacy.lang.en.stop_words import STOP_WORDS
+    from spacy.lang.lex_attrs import like_url, is_punct
+    return STOP_WORDS, like_url, is_punct
+
+def _clean(doc) -> str:
+    return ' '.join(token.text.lower() for token in doc if not token.is_stop and not token.like_url and not token.is_punct)
+
+def _regex_clean(text: str) -> str:
+    stop_words, like_url, is_punct = _lexical_rules()
+    kept = []
+    for chunk in text.split():
+        if like_url(chunk.rstrip(".,!?;:)\"'")):
+            continue
+        for token in TOKEN_PATTERN.findall(chunk):
+            lower = token.lower()
+            if lower not in stop_words and not is_punct(token):
+                kept.append(lower)
+    return ' '.join(kept)
+
+def preprocess_texts(texts: List[str], backend: str = PREPROCESS_BACKEND, batch_size: int = PREPROCESS_BATCH_SIZE, n_process: int = PREPROCESS_N_PROCESS) -> List[str]:
+    """
+    Cleans a batch of texts. spaCy backends run nlp.pipe (n_process > 1 tokenizes in worker
+    processes); the "regex" backend approximates the spaCy tokenizer without building a pipeline.
+    """
+    if backend == "regex":
+        return [_regex_clean(text) for text in texts]
+    return [_clean(doc) for doc in get_nlp(backend).pipe(texts, batch_size=batch_size, n_process=n_process)]
+
+def preprocess_text(text: str, backend: str = PREPROCESS_BACKEND) -> str:
     """
     Cleans text: Remove stop words, URSs, normalize.
     """
-    doc = nlp(text)
-    cleaned = ' '.join(token.text.lower() for token in doc if not token.is_stop and not token.like_url and not token.is_punct)
-    return cleaned
\ No newline at end of file
+    if backend == "regex":
+        return _regex_clean(text)
+    return _clean(get_nlp(backend)(text))
@@ -1,22 +1,81 @@
 import os
+import json
+from typing import Iterable
 from celery import Celery
-from redbeat.schedulers import RedBeatScheduler
+from redbeat.schedulers import RedBeatScheduler, RedBeatSchedulerEntry, RedBeatJSONEncoder, ensure_conf, get_redis
+from src.ingestion_service import wheel
 from dotenv import load_dotenv
 
 load_dotenv()
 REDIS_URL = os.getenv("REDIS_URL")
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "redbeat")  # "redbeat": one beat entry per job; "wheel": Redis timing wheel
+WHEEL_TICK_SECONDS = float(os.getenv("WHEEL_TICK_SECONDS", "5"))
+REAP_INTERVAL_SECONDS = float(os.getenv("REAP_INTERVAL_SECONDS", "300"))
 
 def configure_celery_beat(app: Celery):
     """Configure Celery Beat with RedBeat for dynamic scheduling."""
     
     app.conf.beat_scheduler = RedBeatScheduler
     app.conf.redbeat_redis_url = REDIS_URL
-    app.conf.beat_max_loop_interval = 60
+    app.conf.beat_max_loop_interval = min(60, WHEEL_TICK_SECONDS) if SCHEDULER_MODE == "wheel" else 60
 
     app.conf.beat_schedule = {
         "refresh-schedule": {
             "task": "src.ingestion_service.tasks.refresh_dynamic_schedule",
             "schedule": 60,
             "args": ()
+        },
+        "reap-expired-jobs": {
+            "task": "src.ingestion_service.tasks.reap_expired_jobs",
+            "schedule": REAP_INTERVAL_SECONDS,
+            "args": ()
+        }
+    }
+    if SCHEDULER_MODE == "wheel":
+        # Jobs live on the timing wheel instead of in per-job RedBeat entries; this tick pops the due ones
+        app.conf.beat_schedule["dispatch-due-jobs"] = {
+            "task": "src.ingestion_service.tasks.dispatch_due_jobs",
+            "schedule": WHEEL_TICK_SECONDS,
+            "args": ()
         }
-    }
\ No newline at end of file
+
+def save_entries(app: Celery, entries: Iterable[RedBeatSchedulerEntry]) -> int:
+    """
+    Writes many RedBeat entries in one pipeline. Issues the same commands as
+    RedBeatSchedulerEntry.save(), which costs a round trip per entry.
+    """
+    saved = 0
+    with get_redis(app).pipeline() as pipe:
+        for entry in entries:
+            definition = {
+                'name': entry.name,
+                'task': entry.task,
+                'args': entry.args,
+                'kwargs': entry.kwargs,
+                'options': entry.options,
+                'schedule': entry.schedule,
+                'enabled': entry.enabled,
+            }
+            pipe.hset(entry.key, 'definition', json.dumps(definition, cls=RedBeatJSONEncoder))
+            pipe.hsetnx(entry.key, 'meta', json.dumps({'last_run_at': entry.last_run_at}, cls=RedBeatJSONEncoder))
+            pipe.zadd(app.redbeat_conf.schedule_key, {entry.key: entry.score})
+            saved += 1
+        pipe.execute()
+    return saved
+
+def remove_schedule_entries(app: Celery, job_ids: Iterable[str]):
+    """
+    Unschedules jobs in one pipeline: their RedBeat entries and schedule members, and their
+    timing-wheel entries, whichever mode scheduled them.
+    """
+    job_ids = [str(job_id) for job_id in job_ids]
+    if not job_ids:
+        return
+    conf = ensure_conf(app)
+    keys = [f"{conf.key_prefix}ingest-job-{job_id}" for job_id in job_ids]
+    with get_redis(app).pipeline(transaction=False) as pipe:
+        pipe.delete(*keys)
+        pipe.zrem(conf.schedule_key, *keys)
+        pipe.zrem(wheel.DUE_KEY, *job_ids)
+        pipe.hdel(wheel.JOBS_KEY, *job_ids)
+        pipe.execute()
@@ -1,24 +1,36 @@
 from .app import celery_app
-from src.models import MonitoringJobDB, CommentData
-from src.ingestion_service.youtube_fetcher import fetch_comments
-from src.ingestion_service.preprocessor import preprocess_text
+from src.models import MonitoringJobDB, JobAggregateDB, Aggregate, CommentData
+from src.utils import mean_confidence_interval
+from src.publisher import publisher
+from src.codec import encode
+from src.ingestion_service.coalescer import fetch_comments_coalesced
+from src.ingestion_service.dedup import filter_unseen, mark_seen
+from src.ingestion_service.preprocessor import preprocess_texts
+from src.ingestion_service.scheduler import save_entries, remove_schedule_entries, SCHEDULER_MODE
+from src.ingestion_service import wheel
 from redbeat import RedBeatSchedulerEntry
-import pika
-import json
+from redis import Redis
+from redis.exceptions import LockError
 from dotenv import load_dotenv
 import os
 from tenacity import retry, stop_after_attempt, wait_exponential
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func
 import structlog
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 load_dotenv()
 DB_URL = os.getenv("DB_URL")
-RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+REDIS_URL = os.getenv("REDIS_URL")
+ANALYSIS_CHUNK_SIZE = int(os.getenv("ANALYSIS_CHUNK_SIZE", "500"))
+SCHEDULE_REFRESH_BATCH_SIZE = int(os.getenv("SCHEDULE_REFRESH_BATCH_SIZE", "1000"))
+SCHEDULE_REFRESH_LOCK_TIMEOUT_SECONDS = int(os.getenv("SCHEDULE_REFRESH_LOCK_TIMEOUT_SECONDS", "300"))
+WHEEL_DISPATCH_BATCH_SIZE = int(os.getenv("WHEEL_DISPATCH_BATCH_SIZE", "1000"))
+REAP_BATCH_SIZE = int(os.getenv("REAP_BATCH_SIZE", "1000"))
 
 engine = create_engine(DB_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+redis_client = Redis.from_url(REDIS_URL)
 logger = structlog.get_logger()
 
 @celery_app.task(name='src.ingestion_service.tasks.process_job_task')
@@ -31,10 +43,9 @@ def process_job(job_data: dict):
 
         job = db.query(MonitoringJobDB).filter(MonitoringJobDB.job_id == job_data['job_id']).first()
         if job:
-            expiration_time_naive = job.created_at + timedelta(seconds=job.total_duration_seconds)
-            expiration_time_aware = expiration_time_naive.replace(tzinfo=timezone.utc)
+            expiration_time_aware = job.expires_at.replace(tzinfo=timezone.utc)
 
-            if expiration_time_aware <= datetime.now(timezone.utc):
+            if job.finished_at is not None or expiration_time_aware <= datetime.now(timezone.utc):
                 logger.info("Job expired, skipping ingestion and deleting schedule entry.", job_id=job_data['job_id'])
 
                 # Delete RedBeat schedule entry
@@ -45,25 +56,31 @@ def process_job(job_data: dict):
                     logger.info("Deleted RedBeat schedule entry", job_id=job_data['job_id'], entry_name=entry_name)
                 except KeyError:
                     logger.warning("RedBeat schedule entry not found for deletion", job_id=job_data['job_id'], entry_name=entry_name)
+                if SCHEDULER_MODE == "wheel":
+                    wheel.remove_jobs(redis_client, [job_data['job_id']])
                 return
 
             last_fetched_at = job.last_fetched_at if job and job.last_fetched_at else None
 
-            # Fetch all comments
-            all_comments = fetch_comments(job_data['post_id'])
-            
-            # Filter new comments (published_at > last_fetched_at)
-            if last_fetched_at:
-                new_comments = [c for c in all_comments if datetime.fromisoformat(c['published_at'][:-1] + '+00:00') > last_fetched_at.replace(tzinfo=timezone.utc)]
-            else:
-                new_comments = all_comments
+            # Fetch only new comments (published_at > last_fetched_at); paging stops at the watermark
+            # and jobs watching the same post share one upstream fetch
+            fetched_comments, fetched_at = fetch_comments_coalesced(redis_client, job_data['post_id'], since=last_fetched_at)
+
+            # Drop comments already sent for analysis (retries, clock skew, equal timestamps)
+            new_comments = filter_unseen(redis_client, job_data['job_id'], fetched_comments)
 
             if not new_comments:
+                # Nothing was published up to the fetch, which may have been served from the coalescing
+                # cache; advancing only to the fetch time keeps comments posted since then in range
+                if not fetched_comments:
+                    job.last_fetched_at = fetched_at
+                    db.commit()
+                db.close()
                 logger.info("No new comments", job_id=job_data['job_id'])
                 return
 
             # Preprocess comments
-            preprocessed = [preprocess_text(c['text']) for c in new_comments]
+            preprocessed = preprocess_texts([c['text'] for c in new_comments])
 
             # Metadata for tracibility
             interval_timestamp = max(c['published_at'] for c in new_comments)
@@ -72,24 +89,20 @@ def process_job(job_data: dict):
                 'interval_timestamp': interval_timestamp
             }
 
-            # Publish batches to RabbitMQ
-            connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
-            channel = connection.channel()
-            channel.queue_declare(queue='analysis_queue', durable=True)
-            payload = { **metadata, 'comments': preprocessed }
-            channel.basic_publish(
-                exchange='',
-                routing_key='analysis_queue',
-                body=json.dumps(payload)
-            )
-            connection.close()
+            # Publish batches to RabbitMQ in bounded chunks so AI workers can share a large interval;
+            # aggregation reassembles them by (job_id, interval_timestamp)
+            chunks = [preprocessed[i:i + ANALYSIS_CHUNK_SIZE] for i in range(0, len(preprocessed), ANALYSIS_CHUNK_SIZE)]
+            for chunk_idx, chunk in enumerate(chunks):
+                payload = { **metadata, 'chunk_idx': chunk_idx, 'chunk_count': len(chunks), 'comments': chunk }
+                body, properties = encode(payload)
+                publisher.publish('analysis_queue', body, properties)
+            mark_seen(redis_client, job_data['job_id'], (c['comment_id'] for c in new_comments), expiration_time_aware)
 
-            new_last_fetched_at = max(datetime.fromisoformat(c['published_at'][:-1] + '+00:00') for c in new_comments) if new_comments else datetime.now(timezone.utc)
-            job.last_fetched_at = new_last_fetched_at
+            job.last_fetched_at = max(datetime.fromisoformat(c['published_at'][:-1] + '+00:00') for c in new_comments)
             db.commit()
             db.close()
 
-            logger.info("Data ingested and published", job_id=job_data['job_id'])
+            logger.info("Data ingested and published", job_id=job_data['job_id'], comments=len(preprocessed), chunks=len(chunks))
         else:
             logger.warning("Job not found", job_id=job_data['job_id'])
             entry_name = f"redbeat:ingest-job-{job_data['job_id']}"
@@ -99,39 +112,152 @@ def process_job(job_data: dict):
                 logger.info("Deleted RedBeat schedule entry for non-existent job", job_id=job_data['job_id'], entry_name=entry_name)
             except KeyError:
                 logger.warning("RedBeat schedule entry not found for deletion", job_id=job_data['job_id'], entry_name=entry_name)
+            if SCHEDULER_MODE == "wheel":
+                wheel.remove_jobs(redis_client, [job_data['job_id']])
     except Exception as e:
         logger.error("Ingestion failed", job_id=job_data['job_id'], error=str(e))
         raise
 
+def job_is_active():
+    """SQL condition for jobs still within their total duration (expires_at is stored as naive UTC)."""
+    return MonitoringJobDB.expires_at > func.timezone('utc', func.now())
+
 @celery_app.task(name='src.ingestion_service.tasks.refresh_dynamic_schedule')
 def refresh_dynamic_schedule():
     """Task to add unscheduled jobs to RedBeat dynamically."""
-    
+
+    # A tick that outlives the beat interval must not race the next one over the same jobs
+    lock = redis_client.lock("vibesense:lock:refresh-schedule", timeout=SCHEDULE_REFRESH_LOCK_TIMEOUT_SECONDS)
+    if not lock.acquire(blocking=False):
+        logger.info("Schedule refresh already running, skipping tick")
+        return
+
     logger.info("Refreshing dynamic schedule")
     db = SessionLocal()
+    scheduled = 0
     try:
-        jobs = db.query(MonitoringJobDB).filter(MonitoringJobDB.is_scheduled == False).all()
-        for job in jobs:
-            logger.info("Scheduling job", job_id=job.job_id)
-            # Only schedule if job is still active (within total_duration)
-            expiration_time_naive = job.created_at + timedelta(seconds=job.total_duration_seconds)
-            expiration_time_aware = expiration_time_naive.replace(tzinfo=timezone.utc)
-            if expiration_time_aware > datetime.now(timezone.utc):
-                interval_seconds = job.intervals_seconds
-                # Add to RedBeat (persistent schedule in Redis)
-                entry_name = f"ingest-job-{job.job_id}"
-                RedBeatSchedulerEntry(
-                    name=entry_name,
+        # Only schedule jobs that are still active (within total_duration); the filter runs in SQL
+        jobs = db.query(
+            MonitoringJobDB.job_id, MonitoringJobDB.post_id, MonitoringJobDB.intervals_seconds,
+            MonitoringJobDB.expires_at
+        ).filter(MonitoringJobDB.is_scheduled == False, MonitoringJobDB.finished_at.is_(None), job_is_active()).order_by(MonitoringJobDB.created_at).all()
+
+        for start in range(0, len(jobs), SCHEDULE_REFRESH_BATCH_SIZE):
+            batch = jobs[start:start + SCHEDULE_REFRESH_BATCH_SIZE]
+            if SCHEDULER_MODE == "wheel":
+                wheel.add_jobs(redis_client, ({
+                    "job_id": str(job.job_id),
+                    "post_id": job.post_id,
+                    "interval": job.intervals_seconds,
+                    "expires_at": job.expires_at.replace(tzinfo=timezone.utc).timestamp()
+                } for job in batch))
+            else:
+                # Add to RedBeat (persistent schedule in Redis) in one pipelined round trip
+                save_entries(celery_app, (RedBeatSchedulerEntry(
+                    name=f"ingest-job-{job.job_id}",
                     task="src.ingestion_service.tasks.process_job_task",
-                    schedule=interval_seconds,
+                    schedule=job.intervals_seconds,
                     args=[{"job_id": str(job.job_id), "post_id": job.post_id}],
                     app=celery_app
-                ).save()
-                
-                job.is_scheduled = True
-                db.commit()
-                logger.info("Job scheduled", job_id=job.job_id, interval_seconds=interval_seconds)
+                ) for job in batch))
+
+            db.query(MonitoringJobDB).filter(
+                MonitoringJobDB.job_id.in_([job.job_id for job in batch])
+            ).update({MonitoringJobDB.is_scheduled: True}, synchronize_session=False)
+            db.commit()
+            scheduled += len(batch)
+            lock.extend(SCHEDULE_REFRESH_LOCK_TIMEOUT_SECONDS, replace_ttl=True)
+    finally:
+        db.close()
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("Schedule refresh lock expired before release")
+
+    logger.info("Dynamic schedule refresh complete", scheduled=scheduled)
+
+@celery_app.task(name='src.ingestion_service.tasks.dispatch_due_jobs')
+def dispatch_due_jobs():
+    """Beat tick of the timing wheel: enqueue process_job for every due job, in batches."""
+    dispatched = 0
+    with celery_app.producer_or_acquire() as producer:
+        while True:
+            due = wheel.pop_due(redis_client, WHEEL_DISPATCH_BATCH_SIZE)
+            for job_data in due:
+                process_job.apply_async(args=[job_data], producer=producer)
+            dispatched += len(due)
+            if len(due) < WHEEL_DISPATCH_BATCH_SIZE:
+                break
+    if dispatched:
+        logger.info("Dispatched due jobs", dispatched=dispatched)
+
+def final_summary(rollup: JobAggregateDB) -> Aggregate:
+    """Whole-job figures from the rollup; the interval fields repeat the overall ones."""
+    overall_confidence = rollup.confidence_sum / rollup.interval_count
+    return Aggregate(
+        interval_sentiment=rollup.sentiment_mean,
+        interval_confidence=overall_confidence,
+        overall_sentiment=rollup.sentiment_mean,
+        overall_confidence=overall_confidence,
+        overall_ci=mean_confidence_interval(rollup.interval_count, rollup.sentiment_mean, rollup.sentiment_m2)
+    )
+
+@celery_app.task(name='src.ingestion_service.tasks.reap_expired_jobs')
+def reap_expired_jobs():
+    """Finish expired jobs in bulk: unschedule them, mark them finished and send their final summary."""
+
+    lock = redis_client.lock("vibesense:lock:reap-expired-jobs", timeout=SCHEDULE_REFRESH_LOCK_TIMEOUT_SECONDS)
+    if not lock.acquire(blocking=False):
+        logger.info("Expired-job reaper already running, skipping tick")
+        return
+
+    db = SessionLocal()
+    reaped = 0
+    try:
+        while True:
+            # A range scan of ix_monitoring_jobs_unfinished_expires_at: only expired, unfinished jobs are read
+            expired = db.query(MonitoringJobDB.job_id, JobAggregateDB).outerjoin(
+                JobAggregateDB, JobAggregateDB.job_id == MonitoringJobDB.job_id
+            ).filter(
+                MonitoringJobDB.finished_at.is_(None), MonitoringJobDB.expires_at <= func.timezone('utc', func.now())
+            ).order_by(MonitoringJobDB.expires_at).limit(REAP_BATCH_SIZE).all()
+            if not expired:
+                break
+            job_ids = [job_id for job_id, _ in expired]
+            # Read before the commit expires the rollup rows; jobs without any interval get no summary
+            summaries = {str(job_id): final_summary(rollup) for job_id, rollup in expired if rollup is not None and rollup.interval_count}
+
+            remove_schedule_entries(celery_app, job_ids)
+            finished_at = datetime.now(timezone.utc)
+            db.query(MonitoringJobDB).filter(MonitoringJobDB.job_id.in_(job_ids)).update(
+                {MonitoringJobDB.finished_at: finished_at.replace(tzinfo=None)}, synchronize_session=False
+            )
+            db.commit()
+            reaped += len(job_ids)
+
+            # Jobs are marked finished first, so a failed publish loses a summary rather than sending it twice
+            for job_id, summary in summaries.items():
+                payload = {
+                    'job_id': job_id,
+                    'interval_timestamp': finished_at.isoformat(),
+                    'final': True,
+                    'aggregate': summary.model_dump()
+                }
+                try:
+                    body, properties = encode(payload)
+                    publisher.publish('notification_queue', body, properties)
+                except Exception as e:
+                    logger.error("Final summary publish failed", job_id=str(job_id), error=str(e))
+
+            lock.extend(SCHEDULE_REFRESH_LOCK_TIMEOUT_SECONDS, replace_ttl=True)
+            if len(expired) < REAP_BATCH_SIZE:
+                break
     finally:
         db.close()
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("Expired-job reaper lock expired before release")
 
-    logger.info("Dynamic schedule refresh complete")
\ No newline at end of file
+    if reaped:
+        logger.info("Reaped expired jobs", reaped=reaped)
@@ -0,0 +1,73 @@
+import json
+import time
+from typing import Dict, Iterable, List, Optional
+from redis import Redis
+
+DUE_KEY = "vibesense:wheel:due"    # zset: job_id -> next due time (unix seconds)
+JOBS_KEY = "vibesense:wheel:jobs"  # hash: job_id -> "<interval> <expires_at> <process_job args as JSON>"
+
+# KEYS: due zset, jobs hash; ARGV: now, limit
+# Pops up to `limit` due jobs and returns their args. Each popped job is moved to its next due
+# time, skipping ticks it missed, or dropped once that time is past its expiry.
+POP_DUE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'WITHSCORES', 'LIMIT', 0, tonumber(ARGV[2]))
+local popped = {}
+for i = 1, #due, 2 do
+    local job_id = due[i]
+    local entry = redis.call('HGET', KEYS[2], job_id)
+    local interval, expires_at, args
+    if entry then
+        interval, expires_at, args = string.match(entry, '^(%S+) (%S+) (.*)$')
+    end
+    if not args or now >= tonumber(expires_at) then
+        redis.call('ZREM', KEYS[1], job_id)
+        redis.call('HDEL', KEYS[2], job_id)
+    else
+        table.insert(popped, args)
+        interval = tonumber(interval)
+        local next_due = tonumber(due[i + 1]) + interval
+        if next_due <= now then
+            next_due = now + interval
+        end
+        if next_due >= tonumber(expires_at) then
+            redis.call('ZREM', KEYS[1], job_id)
+            redis.call('HDEL', KEYS[2], job_id)
+        else
+            redis.call('ZADD', KEYS[1], next_due, job_id)
+        end
+    end
+end
+return popped
+"""
+
+def add_jobs(client: Redis, jobs: Iterable[Dict], now: Optional[float] = None) -> int:
+    """
+    Puts jobs on the wheel, first due now. Each job is a dict with job_id, post_id,
+    interval (seconds) and expires_at (unix seconds). Jobs already on the wheel keep their due time.
+    """
+    now = time.time() if now is None else now
+    added = 0
+    with client.pipeline(transaction=False) as pipe:
+        for job in jobs:
+            args = json.dumps({"job_id": job['job_id'], "post_id": job['post_id']})
+            pipe.hset(JOBS_KEY, job['job_id'], f"{float(job['interval'])!r} {float(job['expires_at'])!r} {args}")
+            pipe.zadd(DUE_KEY, {job['job_id']: now}, nx=True)
+            added += 1
+        pipe.execute()
+    return added
+
+def remove_jobs(client: Redis, job_ids: Iterable[str]):
+    job_ids = [str(job_id) for job_id in job_ids]
+    if not job_ids:
+        return
+    with client.pipeline(transaction=False) as pipe:
+        pipe.zrem(DUE_KEY, *job_ids)
+        pipe.hdel(JOBS_KEY, *job_ids)
+        pipe.execute()
+
+def pop_due(client: Redis, limit: int, now: Optional[float] = None) -> List[Dict]:
+    """Returns the process_job args of up to `limit` due jobs and reschedules them."""
+    now = time.time() if now is None else now
+    popped = client.register_script(POP_DUE_SCRIPT)(keys=[DUE_KEY, JOBS_KEY], args=[repr(float(now)), limit])
+    return [json.loads(args) for args in popped]
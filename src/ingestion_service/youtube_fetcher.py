@@ -1,19 +1,23 @@
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
 import os
-from typing import List, Dict
-from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime, timezone
 
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
 
-def fetch_comments(video_id: str) -> List[Dict]:
+def iter_comments(video_id: str, since: Optional[datetime] = None) -> Iterator[Dict]:
     """
-    Fetches comments for a video ID with pagination.
-    Returns a list of dicts: {'comment_id': str, 'text': str, 'published_at': datetime, 'metrics': dict}
+    Lazily yields comments for a video ID, newest first, one API page at a time.
+    If `since` is given, only comments published strictly after it are yielded and paging
+    stops at the first comment that is not newer, since the API returns threads ordered by time.
+    Naive `since` values are treated as UTC.
     """
-    comments = []
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
     next_page_token = None
 
     while True:
@@ -29,17 +33,25 @@ def fetch_comments(video_id: str) -> List[Dict]:
             snippet = item["snippet"]["topLevelComment"]["snippet"]
             published_at_str = snippet["publishedAt"]
             published_at = datetime.fromisoformat(published_at_str.replace("Z", "+00:00"))
-            comments.append({
+            if since is not None and published_at <= since:
+                return
+            yield {
                 "comment_id": item["id"],
                 "text": snippet["textOriginal"],
-                "published_at": snippet["publishedAt"],
+                "published_at": published_at_str,
                 "metrics": {
                     "like_count": snippet.get("likeCount", 0)
                 }
-            })
+            }
 
         next_page_token = response.get("nextPageToken")
         if not next_page_token:
             break
 
-    return comments
\ No newline at end of file
+def fetch_comments(video_id: str, since: Optional[datetime] = None) -> List[Dict]:
+    """
+    Fetches comments for a video ID with pagination.
+    With `since`, only comments newer than the watermark are fetched (see iter_comments).
+    Returns a list of dicts: {'comment_id': str, 'text': str, 'published_at': str, 'metrics': dict}
+    """
+    return list(iter_comments(video_id, since=since))
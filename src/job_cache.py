@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from sqlalchemy.orm import Session
+from src.models import JobMetadata, MonitoringJobDB
+
+class JobCache:
+    """
+    In-process cache of job metadata for consumers that look a job up on every message.
+    Entries expire after ttl_seconds and the least recently used are evicted beyond
+    max_entries; missing jobs are not cached.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], ttl_seconds: float = 600, max_entries: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, JobMetadata]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, job_id: str) -> Optional[JobMetadata]:
+        """Returns the job's metadata, reading the database on a miss; None if the job does not exist."""
+        job_id = str(job_id)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(job_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        db = self.session_factory()
+        try:
+            job = db.query(MonitoringJobDB).filter(MonitoringJobDB.job_id == job_id).first()
+        finally:
+            db.close()
+        if job is None:
+            self.invalidate(job_id)
+            return None
+
+        metadata = JobMetadata.from_row(job)
+        with self._lock:
+            self._entries[job_id] = (now + self.ttl_seconds, metadata)
+            self._entries.move_to_end(job_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return metadata
+
+    def invalidate(self, job_id: Optional[str] = None):
+        """Drops one job's entry, or every entry when job_id is None."""
+        with self._lock:
+            if job_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(job_id), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr, validator
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Tuple
-from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey, JSON
+from typing import Dict, Optional, Tuple
+from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey, Index, Integer, JSON, text
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 from uuid import uuid4
@@ -21,6 +21,13 @@ class MonitoringJobDB(Base):
     is_scheduled = Column(Boolean, default=False)
     last_fetched_at = Column(DateTime, default=None)
     created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    expires_at = Column(DateTime, nullable=False)  # created_at + total_duration_seconds, stored so expiry filters can use an index
+    finished_at = Column(DateTime, default=None)  # set by the expired-job reaper
+
+    __table_args__ = (
+        Index("ix_monitoring_jobs_unscheduled", "created_at", postgresql_where=text("is_scheduled = false")),
+        Index("ix_monitoring_jobs_unfinished_expires_at", "expires_at", postgresql_where=text("finished_at IS NULL")),
+    )
 
 class IntervalResultDB(Base):
     __tablename__ = "interval_results"
@@ -32,6 +39,20 @@ class IntervalResultDB(Base):
     summary = Column(String)
     raw_comments = Column(JSON)  # Store list of CommentData JSON for history
 
+    __table_args__ = (
+        Index("ix_interval_results_job_id_timestamp", "job_id", "timestamp"),
+    )
+
+class JobAggregateDB(Base):
+    """Running per-job rollup of interval results, updated in the same transaction as each insert."""
+    __tablename__ = "job_aggregates"
+    job_id = Column(UUID(as_uuid=True), ForeignKey("monitoring_jobs.job_id"), primary_key=True)
+    interval_count = Column(Integer, nullable=False, default=0)
+    sentiment_mean = Column(Float, nullable=False, default=0.0)
+    sentiment_m2 = Column(Float, nullable=False, default=0.0)  # Welford sum of squared deviations
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime)
+
 # Pydantic Models (for API/Validation)
 class UserInput(BaseModel):
     full_name: str
@@ -48,6 +69,30 @@ class MonitoringJob(BaseModel):
     email: EmailStr
     user_full_name: str
 
+class JobMetadata(BaseModel):
+    """Fields of a monitoring job that do not change during its lifetime."""
+    job_id: str
+    post_id: str
+    post_title: Optional[str] = None
+    user_full_name: str
+    email: str
+    intervals_seconds: float
+    total_duration_seconds: float
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, job: "MonitoringJobDB") -> "JobMetadata":
+        return cls(
+            job_id=str(job.job_id),
+            post_id=job.post_id,
+            post_title=job.post_title,
+            user_full_name=job.user_full_name,
+            email=job.email,
+            intervals_seconds=job.intervals_seconds,
+            total_duration_seconds=job.total_duration_seconds,
+            created_at=job.created_at
+        )
+
 class CommentData(BaseModel):
     comment_id: str
     text: str
@@ -58,9 +103,11 @@ class AnalysisOutput(BaseModel):
     text: str
     sentiment: str  # "POSITIVE", "NEGATIVE"
     confidence: float
+    skipped: bool = False  # nothing left to analyze after preprocessing; excluded from aggregates
 
 class Aggregate(BaseModel):
     interval_sentiment: float
     overall_sentiment: float
     interval_confidence: float
-    overall_confidence: float
\ No newline at end of file
+    overall_confidence: float
+    overall_ci: Optional[Tuple[float, float]] = None  # 95% CI of the mean interval sentiment
\ No newline at end of file
@@ -3,16 +3,21 @@ from fastapi import FastAPI
 from dotenv import load_dotenv
 import os
 import pika
-import json
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import signal
+import time
 import structlog
-import smtplib
+from functools import partial
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from jinja2 import Template
-from src.models import Aggregate, Base, MonitoringJobDB
+from src.models import Aggregate, Base
+from src.job_cache import JobCache
+from src.codec import decode
+from src.notification_service.smtp_pool import SMTPPool
+from src.notification_service.digest import DigestBuffer
 
 load_dotenv()
 RABBITMQ_URL = os.getenv("RABBITMQ_URL")
@@ -21,6 +26,13 @@ SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+NOTIFY_PREFETCH_COUNT = int(os.getenv("NOTIFY_PREFETCH_COUNT", "256"))  # also bounds notifications held in digests
+NOTIFY_DIGEST_WINDOW_SECONDS = float(os.getenv("NOTIFY_DIGEST_WINDOW_SECONDS", "120"))  # 0 sends every message at once
+NOTIFY_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("NOTIFY_SHUTDOWN_TIMEOUT_SECONDS", "30"))
+JOB_CACHE_TTL_SECONDS = float(os.getenv("JOB_CACHE_TTL_SECONDS", "600"))
+JOB_CACHE_SIZE = int(os.getenv("JOB_CACHE_SIZE", "10000"))
 FROM_EMAIL = SMTP_USER
 
 app = FastAPI(title="Notification Service")
@@ -30,6 +42,10 @@ logger = structlog.get_logger()
 engine = create_engine(DB_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base.metadata.create_all(bind=engine)
+job_cache = JobCache(SessionLocal, ttl_seconds=JOB_CACHE_TTL_SECONDS, max_entries=JOB_CACHE_SIZE)
+
+# Authenticated SMTP sessions shared by every send in this process
+smtp_pool = SMTPPool(SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS, starttls=SMTP_STARTTLS, size=SMTP_POOL_SIZE)
 
 # Email Template (Jinja2) - using HTML
 email_template = Template("""
@@ -49,16 +65,20 @@ email_template = Template("""
 </head>
 <body>
   <div class="container">
-    <div class="header">🚀 VibeSense Alert</div>
+    <div class="header">🚀 VibeSense {{ "Final Report" if final else "Alert" }}</div>
     <p>Hi {{user_full_name}},</p>
+    {% if final %}
+    <p>Monitoring of your video <strong>"{{ post_title }}"</strong> finished on {{ interval_timestamp }}. Here's how the comments felt over the whole run:</p>
+    {% else %}
     <p>Exciting update! We've analyzed the latest comments on your video <strong>"{{ post_title }}"</strong> for the past {{ interval_duration }} hours up to {{ interval_timestamp }}. Here's what the buzz is saying:</p>
 
     <div class="section-title">🌟 Interval Highlights</div>
     <div class="highlight-card">
       <p>Average Sentiment: <span class="sentiment-{{ interval_sentiment | lower }}">{{ interval_sentiment }}</span> (Confidence: {{ interval_confidence }})</p>
     </div>
+    {% endif %}
 
-    <div class="section-title">📈 Overall Trends So Far</div>
+    <div class="section-title">📈 {{ "Overall Results" if final else "Overall Trends So Far" }}</div>
      <div class="highlight-card">
       <p>Average Sentiment: <span class="sentiment-{{ overall_sentiment | lower }}">{{ overall_sentiment }}</span> (Confidence: {{ overall_confidence }})</p>
     </div>
@@ -66,7 +86,7 @@ email_template = Template("""
     <p>Act on these insights—reply to comments or tweak your content to boost engagement!</p>
 
     <div class="footer">
-      <p>Stay tuned for more,<br>The VibeSense Team</p>
+      <p>{{ "Thanks for using VibeSense," if final else "Stay tuned for more," }}<br>The VibeSense Team</p>
       <p>P.S. Questions? Reply to this email.</p>
     </div>
   </div>
@@ -82,6 +102,11 @@ async def notify_manual(job_id: str, aggregate: Aggregate):
     send_email("Test User", "Test Post Title", aggregate, 1.0, datetime.now(timezone.utc).isoformat(), "test@domain.com")
     return {"status": "Email sent"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the job metadata cache in this process."""
+    return job_cache.stats()
+
 # Queue Consumer (Run in Worker Process)
 def run_consumer():
     @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=60),
@@ -90,41 +115,119 @@ def run_consumer():
         connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
         channel = connection.channel()
         channel.queue_declare(queue="notification_queue", durable=True)
+        channel.basic_qos(prefetch_count=NOTIFY_PREFETCH_COUNT)
 
-        def callback(ch, method, properties, body):
-            db = SessionLocal()
-            try:
-                data = json.loads(body)
-                aggregate = Aggregate(**data['aggregate'])
-                metadata = {k: v for k, v in data.items() if k != 'aggregate'}
+        digests = DigestBuffer()
+        in_flight = set()  # delivery tags handed to the SMTP pool and not yet acked or nacked
+
+        def on_sent(delivery_tags, job_id, future):
+            """Runs on the connection thread once the pool has sent (or failed to send) the email."""
+            error = future.exception()
+            in_flight.difference_update(delivery_tags)
+            for tag in delivery_tags:
+                if error is None:
+                    channel.basic_ack(delivery_tag=tag)
+                else:
+                    channel.basic_nack(delivery_tag=tag, requeue=True)
+            if error is None:
+                logger.info("Email sent", job_id=job_id, notifications=len(delivery_tags), job_cache=job_cache.stats())
+            else:
+                logger.error("Notification failed", job_id=job_id, error=str(error))
 
-                job = db.query(MonitoringJobDB).filter(MonitoringJobDB.job_id == metadata['job_id']).first()
+        def flush(job_id):
+            """Sends a job's held notifications as one email; returns the send future, if any."""
+            digest = digests.pop(job_id)
+            if digest is None:
+                return None
+            try:
+                job = job_cache.get(job_id)
                 if not job:
                     raise ValueError("Job not found in DB")
 
                 user_full_name = job.user_full_name
                 email = job.email
                 post_title = job.post_title
-                interval_duration = job.intervals_seconds / 3600
-                interval_timestamp = metadata.get('interval_timestamp')
+                # A digest covers every interval it merged
+                interval_duration = job.intervals_seconds * digest.count / 3600
+
+                # Sending happens on the SMTP pool; the acks are handed back to this connection's thread
+                msg = render_email(user_full_name, post_title, digest.merged(), interval_duration, digest.interval_timestamp, email)
+                future = smtp_pool.submit(msg)
+                in_flight.update(digest.delivery_tags)
+                future.add_done_callback(
+                    lambda f: connection.add_callback_threadsafe(partial(on_sent, digest.delivery_tags, job_id, f))
+                )
+                return future
+            except Exception as e:
+                logger.error("Notification failed", job_id=job_id, error=str(e))
+                for tag in digest.delivery_tags:
+                    channel.basic_nack(delivery_tag=tag, requeue=True)
+                return None
 
-                send_email(user_full_name, post_title, aggregate, interval_duration, interval_timestamp, email)
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                logger.info("Email sent", job_id=metadata.get('job_id'))
+        def send_final(job_id, aggregate, interval_timestamp, delivery_tag):
+            """Sends the reaper's end-of-job summary; the job will not be looked up again."""
+            try:
+                job = job_cache.get(job_id)
+                if not job:
+                    raise ValueError("Job not found in DB")
+                msg = render_email(job.user_full_name, job.post_title, aggregate, job.intervals_seconds / 3600, interval_timestamp, job.email, final=True)
+                job_cache.invalidate(job_id)
+                future = smtp_pool.submit(msg)
+                in_flight.add(delivery_tag)
+                future.add_done_callback(
+                    lambda f: connection.add_callback_threadsafe(partial(on_sent, [delivery_tag], job_id, f))
+                )
+            except Exception as e:
+                logger.error("Notification failed", job_id=job_id, error=str(e))
+                channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+
+        def callback(ch, method, properties, body):
+            try:
+                data = decode(body, properties)
+                aggregate = Aggregate(**data['aggregate'])
+                job_id = data['job_id']
+                interval_timestamp = data['interval_timestamp']
             except Exception as e:
                 logger.error("Notification failed", error=str(e))
                 ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-            finally:
-                db.close()
+                return
+
+            if data.get('final'):
+                # The job has finished: send what is held for it, then the final summary on its own
+                flush(job_id)
+                send_final(job_id, aggregate, interval_timestamp, method.delivery_tag)
+                return
+
+            # Notifications for a job are held for the digest window and merged into one email
+            opened = digests.add(job_id, aggregate, interval_timestamp, method.delivery_tag)
+            if NOTIFY_DIGEST_WINDOW_SECONDS <= 0:
+                flush(job_id)
+            elif opened:
+                connection.call_later(NOTIFY_DIGEST_WINDOW_SECONDS, partial(flush, job_id))
 
         channel.basic_consume(queue="notification_queue", on_message_callback=callback)
-        logger.info("Notification Consumer started")
-        channel.start_consuming()
+        logger.info("Notification Consumer started", smtp_pool_size=SMTP_POOL_SIZE, digest_window_seconds=NOTIFY_DIGEST_WINDOW_SECONDS)
+        try:
+            channel.start_consuming()
+        except KeyboardInterrupt:
+            # Send what is held instead of leaving it to redelivery, then settle the acks before closing
+            channel.stop_consuming()
+            logger.info("Notification Consumer stopping, flushing digests", pending=len(digests))
+            for job_id in digests.job_ids():
+                flush(job_id)
+            # Acks arrive through add_callback_threadsafe, so keep servicing the connection until
+            # every sent email is acked; anything left is redelivered
+            deadline = time.monotonic() + NOTIFY_SHUTDOWN_TIMEOUT_SECONDS
+            while in_flight and time.monotonic() < deadline:
+                connection.process_data_events(time_limit=0.1)
+            if in_flight:
+                logger.warning("Shutdown timed out with notifications in flight", in_flight=len(in_flight))
+            connection.close()
 
     consume()
 
-def send_email(user_full_name: str, post_title: str, aggregate: Aggregate, interval_duration: float, interval_timestamp: str, to_email: str):
-    """Send formatted email using HTML."""
+def render_email(user_full_name: str, post_title: str, aggregate: Aggregate, interval_duration: float, interval_timestamp: str, to_email: str, final: bool = False) -> MIMEMultipart:
+    """Build the formatted HTML email."""
 
     def get_confidence_class(confidence):
         if confidence < 0.4:
@@ -152,24 +255,31 @@ def send_email(user_full_name: str, post_title: str, aggregate: Aggregate, inter
         interval_confidence=get_confidence_class(aggregate.interval_confidence),
         overall_sentiment=get_sentiment_class(aggregate.overall_sentiment),
         overall_confidence=get_confidence_class(aggregate.overall_confidence),
+        final=final,
     )
     
     # Create the root message and set the headers
     msg = MIMEMultipart('alternative')
     msg['From'] = FROM_EMAIL
     msg['To'] = to_email
-    msg['Subject'] = f"🚀 VibeSense Alert: Fresh Insights for Your Video - {post_title}"
+    if final:
+        msg['Subject'] = f"🚀 VibeSense Final Report: Your Video - {post_title}"
+    else:
+        msg['Subject'] = f"🚀 VibeSense Alert: Fresh Insights for Your Video - {post_title}"
 
     # Attach HTML version
     msg_html_part = MIMEText(msg_content_html, 'html')
     msg.attach(msg_html_part)
+    return msg
 
-    # Send the email
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASS)
-        server.send_message(msg)
+def send_email(user_full_name: str, post_title: str, aggregate: Aggregate, interval_duration: float, interval_timestamp: str, to_email: str):
+    """Send formatted email using HTML."""
+    smtp_pool.send(render_email(user_full_name, post_title, aggregate, interval_duration, interval_timestamp, to_email))
 
 if __name__ == "__main__":
     # For running the consumer worker: python src/notification_service/app.py
-    run_consumer()
\ No newline at end of file
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # stop like Ctrl-C, flushing digests
+    try:
+        run_consumer()
+    finally:
+        smtp_pool.close()
\ No newline at end of file
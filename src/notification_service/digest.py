@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.models import Aggregate
+
+class JobDigest:
+    """Notifications for one job held back to be sent as a single email."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.delivery_tags: List[int] = []
+        self.interval_timestamp: Optional[str] = None
+        self._interval_sentiments: List[float] = []
+        self._interval_confidences: List[float] = []
+        self._latest: Optional[Aggregate] = None
+
+    def add(self, aggregate: Aggregate, interval_timestamp: str, delivery_tag: int):
+        self.delivery_tags.append(delivery_tag)
+        self._interval_sentiments.append(aggregate.interval_sentiment)
+        self._interval_confidences.append(aggregate.interval_confidence)
+        # Messages can arrive out of order; the overall figures of the newest interval win
+        if self.interval_timestamp is None or datetime.fromisoformat(interval_timestamp) >= datetime.fromisoformat(self.interval_timestamp):
+            self.interval_timestamp = interval_timestamp
+            self._latest = aggregate
+
+    @property
+    def count(self) -> int:
+        return len(self.delivery_tags)
+
+    def merged(self) -> Aggregate:
+        """Mean of the held interval figures, with the overall figures of the latest interval."""
+        return self._latest.model_copy(update={
+            'interval_sentiment': sum(self._interval_sentiments) / self.count,
+            'interval_confidence': sum(self._interval_confidences) / self.count,
+        })
+
+class DigestBuffer:
+    """Pending digests by job_id. Not thread-safe; used from the consumer's connection thread."""
+
+    def __init__(self):
+        self._digests: Dict[str, JobDigest] = {}
+
+    def add(self, job_id: str, aggregate: Aggregate, interval_timestamp: str, delivery_tag: int) -> bool:
+        """Holds a notification; returns True if it opened a new digest for the job."""
+        digest = self._digests.get(job_id)
+        opened = digest is None
+        if opened:
+            digest = self._digests[job_id] = JobDigest(job_id)
+        digest.add(aggregate, interval_timestamp, delivery_tag)
+        return opened
+
+    def pop(self, job_id: str) -> Optional[JobDigest]:
+        return self._digests.pop(job_id, None)
+
+    def job_ids(self) -> List[str]:
+        return list(self._digests)
+
+    def __len__(self) -> int:
+        return len(self._digests)
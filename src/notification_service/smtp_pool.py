@@ -0,0 +1,99 @@
+import queue
+import smtplib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.message import Message
+from typing import Optional
+import structlog
+
+logger = structlog.get_logger()
+
+class SMTPPool:
+    """
+    Keeps up to `size` authenticated SMTP sessions open and sends through them from a thread
+    pool of the same size, so STARTTLS and LOGIN are paid once per session rather than per email.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, size: int = 4, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self._opened += 1
+        logger.info("SMTP session opened", host=self.host, port=self.port)
+        return server
+
+    def _checkout(self) -> smtplib.SMTP:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP):
+        try:
+            server.close()
+        except OSError:
+            pass
+
+    def send(self, msg: Message):
+        """
+        Sends msg on a pooled session. A session the server has dropped is replaced once;
+        any other failure discards the session and propagates.
+        """
+        server = self._checkout()
+        try:
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                logger.info("SMTP session dropped, reconnecting", host=self.host)
+                self._discard(server)
+                server = self._connect()
+                server.send_message(msg)
+        except smtplib.SMTPRecipientsRefused:
+            # Rejected by the server, but the session itself is still usable
+            self._idle.put(server)
+            raise
+        except Exception:
+            self._discard(server)
+            raise
+        self._idle.put(server)
+
+    def submit(self, msg: Message) -> Future:
+        """Queues msg for sending on the worker pool."""
+        return self._executor.submit(self.send, msg)
+
+    def stats(self) -> dict:
+        return {'sessions_opened': self._opened, 'sessions_idle': self._idle.qsize()}
+
+    def close(self):
+        """Waits for queued sends, then quits every idle session."""
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                server.quit()
+            except OSError:
+                self._discard(server)
@@ -0,0 +1,94 @@
+import atexit
+import os
+import threading
+from typing import Optional, Union
+from dotenv import load_dotenv
+import pika
+from pika.exceptions import AMQPChannelError, AMQPConnectionError
+import structlog
+
+load_dotenv()
+RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+RABBITMQ_HEARTBEAT_SECONDS = int(os.getenv("RABBITMQ_HEARTBEAT_SECONDS", "60"))
+RABBITMQ_PUBLISHER_CONFIRMS = os.getenv("RABBITMQ_PUBLISHER_CONFIRMS", "false").lower() == "true"
+
+logger = structlog.get_logger()
+
+class QueuePublisher:
+    """
+    Long-lived publisher keeping one connection and channel per process, shared by its threads
+    behind a lock (pika connections are neither thread- nor fork-safe). Idle connections get their
+    heartbeats serviced before each publish, and a lost connection is re-opened once before giving
+    up. With confirms enabled, publish blocks until the broker has accepted the message.
+    """
+
+    def __init__(self, url: str, heartbeat: int = RABBITMQ_HEARTBEAT_SECONDS, confirms: bool = RABBITMQ_PUBLISHER_CONFIRMS):
+        self.url = url
+        self.heartbeat = heartbeat
+        self.confirms = confirms
+        self._pid = None
+        self._lock = threading.Lock()
+        self._connection = None
+        self._channel_ = None
+        self._declared = set()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Inherited from the parent of a fork: never touch the parent's socket (or a lock another
+            # of its threads may have held), just forget them
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._connection = None
+            self._channel_ = None
+            self._declared = set()
+
+    def _channel(self):
+        if self._connection is None or self._connection.is_closed or self._channel_ is None or self._channel_.is_closed:
+            self._reset()
+            params = pika.URLParameters(self.url)
+            params.heartbeat = self.heartbeat
+            self._connection = pika.BlockingConnection(params)
+            self._channel_ = self._connection.channel()
+            if self.confirms:
+                self._channel_.confirm_delivery()
+        else:
+            # BlockingConnection only answers heartbeats during I/O; catch up after idle periods
+            self._connection.process_data_events(time_limit=0)
+        return self._channel_
+
+    def _reset(self):
+        if self._connection is not None and self._connection.is_open:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+        self._connection = None
+        self._channel_ = None
+        self._declared = set()
+
+    def publish(self, queue: str, body: Union[str, bytes], properties: Optional[pika.BasicProperties] = None):
+        """Publishes body to a durable queue, declaring it once per channel."""
+        self._check_pid()
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    channel = self._channel()
+                    if queue not in self._declared:
+                        channel.queue_declare(queue=queue, durable=True)
+                        self._declared.add(queue)
+                    channel.basic_publish(exchange='', routing_key=queue, body=body, properties=properties)
+                    return
+                except (AMQPConnectionError, AMQPChannelError) as e:
+                    self._reset()
+                    if attempt:
+                        raise
+                    logger.warning("Publisher connection lost, reconnecting", queue=queue, error=str(e))
+
+    def close(self):
+        self._check_pid()
+        with self._lock:
+            self._reset()
+
+publisher = QueuePublisher(RABBITMQ_URL)
+# Close the broker connection cleanly instead of leaving it to the heartbeat timeout
+atexit.register(publisher.close)
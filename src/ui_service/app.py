@@ -1,8 +1,6 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
-import pika
-import json
 from uuid import uuid4
 from datetime import timedelta
 import re
@@ -13,10 +11,11 @@ from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timezone
 from pydantic import ValidationError
 from src.utils import parse_youtube_video_id
+from src.publisher import publisher
+from src.codec import encode
 
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-RABBITMQ_URL = os.getenv("RABBITMQ_URL")
 DB_URL = os.getenv("DB_URL")
 
 engine = create_engine(DB_URL)
@@ -80,14 +79,12 @@ if submit_button:
             )
 
             # Queue Job
-            connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
-            channel = connection.channel()
-            channel.queue_declare(queue="monitoring_jobs", durable=True)
-            channel.basic_publish(exchange='', routing_key="monitoring_jobs", body=json.dumps(job.model_dump()))
-            connection.close()
+            body, properties = encode(job.model_dump())
+            publisher.publish("monitoring_jobs", body, properties)
 
             db = SessionLocal()
             try:
+                created_at = datetime.now(timezone.utc)
                 job_db = MonitoringJobDB(
                     job_id=job.job_id,
                     post_id=job.post_id,
@@ -96,7 +93,8 @@ if submit_button:
                     email=job.email,
                     intervals_seconds=job.intervals,
                     total_duration_seconds=job.total_duration,
-                    created_at=datetime.now(timezone.utc),
+                    created_at=created_at,
+                    expires_at=created_at + timedelta(seconds=job.total_duration),
                     last_fetched_at=None
                 )
                 db.add(job_db)
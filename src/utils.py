@@ -1,3 +1,5 @@
+import math
+from typing import Tuple
 from urllib.parse import urlparse, parse_qs
 from pydantic import ValidationError
 
@@ -28,4 +30,25 @@ def parse_youtube_video_id(url: str) -> str:
             raise ValueError("Unsupported YouTube URL format")
     
     except Exception as e:
-        raise ValueError(f"Invalid YouTube URL: {e}")
\ No newline at end of file
+        raise ValueError(f"Invalid YouTube URL: {e}")
+
+def welford_update(count: int, mean: float, m2: float, value: float) -> Tuple[int, float, float]:
+    """
+    Adds one observation to a running (count, mean, M2) triple using Welford's algorithm.
+    The sample variance is M2 / (count - 1).
+    """
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+    return count, mean, m2
+
+def mean_confidence_interval(count: int, mean: float, m2: float, z: float = 1.96) -> Tuple[float, float]:
+    """
+    Normal-approximation confidence interval (95% by default) of the mean of a running
+    (count, mean, M2) triple. Collapses to the mean itself with fewer than two observations.
+    """
+    if count < 2:
+        return mean, mean
+    half_width = z * math.sqrt(m2 / (count - 1) / count)
+    return mean - half_width, mean + half_width
@@ -0,0 +1,13 @@
+import pytest
+import spacy
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "requires_model: needs the en_core_web_sm spaCy model; skipped when it is not installed")
+
+def pytest_collection_modifyitems(config, items):
+    if spacy.util.is_package("en_core_web_sm"):
+        return
+    skip = pytest.mark.skip(reason="en_core_web_sm not installed")
+    for item in items:
+        if "requires_model" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,74 @@
+import pytest
+from src.aggregation_service.kernels import aggregate_interval, payload_partials, finalize_interval
+from src.aggregation_service.chunks import add_chunk, release_chunk, clear_chunks, chunk_keys
+
+ROWS = [
+    {'text': '', 'sentiment': 'Very Positive', 'confidence': 0.9, 'skipped': False},
+    {'text': '', 'sentiment': 'Negative', 'confidence': 0.6, 'skipped': False},
+    {'text': '', 'sentiment': 'Neutral', 'confidence': 0.0, 'skipped': True},
+    {'text': '', 'sentiment': 'Neutral', 'confidence': 0.5},
+]
+
+def test_aggregate_interval_weights_by_confidence_and_ignores_skipped():
+    avg_sentiment, avg_confidence = aggregate_interval(ROWS)
+    assert avg_sentiment == pytest.approx((2 * 0.9 + 0 * 0.6 + 1 * 0.5) / (0.9 + 0.6 + 0.5))
+    assert avg_confidence == pytest.approx((0.9 + 0.6 + 0.5) / 3)
+
+def test_aggregate_interval_accepts_columnar_payload():
+    columns = {
+        'sentiment': [r['sentiment'] for r in ROWS],
+        'confidence': [r['confidence'] for r in ROWS],
+        'skipped': [r.get('skipped', False) for r in ROWS],
+    }
+    assert aggregate_interval(columns) == aggregate_interval(ROWS)
+
+def test_aggregate_interval_with_nothing_scored():
+    assert aggregate_interval({'sentiment': ['Neutral'], 'confidence': [0.0], 'skipped': [True]}) is None
+    assert aggregate_interval([]) is None
+
+def test_aggregate_interval_ignores_unknown_labels():
+    assert aggregate_interval({'sentiment': ['Positive', 'Sarcastic'], 'confidence': [0.8, 0.9]}) == (2.0, 0.8)
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeRedis()
+
+def test_chunks_finalize_once_all_arrive_and_match_single_message(fake_redis):
+    chunks = [ROWS[:1], ROWS[1:3], ROWS[3:]]
+    combined = None
+    for chunk_idx in (2, 0, 1):
+        assert combined is None
+        combined = add_chunk(fake_redis, "job-1", "2025-01-01T00:00:00Z", chunk_idx, len(chunks), payload_partials(chunks[chunk_idx]))
+    assert finalize_interval(*combined) == pytest.approx(aggregate_interval(ROWS))
+
+def test_redelivered_chunk_is_not_counted_twice(fake_redis):
+    partials = payload_partials(ROWS[:2])
+    assert add_chunk(fake_redis, "job-1", "ts", 0, 2, partials) is None
+    assert add_chunk(fake_redis, "job-1", "ts", 0, 2, partials) is None
+    combined = add_chunk(fake_redis, "job-1", "ts", 1, 2, payload_partials(ROWS[2:]))
+    assert finalize_interval(*combined) == pytest.approx(aggregate_interval(ROWS))
+
+    clear_chunks(fake_redis, "job-1", "ts")
+    assert fake_redis.exists(*chunk_keys("job-1", "ts")) == 0
+
+def test_interval_is_finalized_only_once_under_redelivery(fake_redis):
+    first, second = payload_partials(ROWS[:2]), payload_partials(ROWS[2:])
+    assert add_chunk(fake_redis, "job-1", "ts", 0, 2, first) is None
+    assert add_chunk(fake_redis, "job-1", "ts", 1, 2, second) is not None
+    assert add_chunk(fake_redis, "job-1", "ts", 0, 2, first) is None
+    assert add_chunk(fake_redis, "job-1", "ts", 1, 2, second) is None
+
+    # Redeliveries after cleanup start a fresh set, but the finalized marker still holds
+    clear_chunks(fake_redis, "job-1", "ts")
+    assert add_chunk(fake_redis, "job-1", "ts", 0, 2, first) is None
+    assert add_chunk(fake_redis, "job-1", "ts", 1, 2, second) is None
+
+def test_released_chunk_finalizes_again_on_redelivery(fake_redis):
+    first, second = payload_partials(ROWS[:2]), payload_partials(ROWS[2:])
+    assert add_chunk(fake_redis, "job-1", "ts", 0, 2, first) is None
+    assert add_chunk(fake_redis, "job-1", "ts", 1, 2, second) is not None
+    release_chunk(fake_redis, "job-1", "ts", 1, second)
+    combined = add_chunk(fake_redis, "job-1", "ts", 1, 2, second)
+    assert finalize_interval(*combined) == pytest.approx(aggregate_interval(ROWS))
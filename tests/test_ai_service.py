@@ -0,0 +1,220 @@
+import pytest
+import asyncio
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.ai_service.batching import length_sorted_order, restore_order, padded_tokens
+from src.ai_service.result_cache import SentimentCache
+from src.ai_service.fast_path import classify_trivial
+from src.ai_service.coalescer import InferenceCoalescer, CoalescerOverloaded
+from src.ai_service.message_batch import process_batch
+from src.ai_service import supervisor
+
+PARITY_TEXTS = [
+    "love this video so much",
+    "worst tutorial i have ever watched",
+    "it was ok i guess",
+    "the audio is terrible but the editing is great",
+    "first",
+    "este video es increíble",
+    "ce n'est pas terrible",
+    "absolutely brilliant work, subscribed",
+    "why is nobody talking about the ending",
+    "meh",
+    "this made my day 😂",
+    "i want my ten minutes back",
+]
+
+def test_length_sorted_order_round_trips():
+    texts = ["a much longer comment here", "hi", "medium one", "ok"]
+    lengths = [len(t.split()) for t in texts]
+    order = length_sorted_order(lengths)
+
+    assert [lengths[i] for i in order] == sorted(lengths)
+    assert restore_order([texts[i] for i in order], order) == texts
+
+def test_sorting_reduces_padding():
+    lengths = [1, 500, 2, 3, 480, 1]
+    assert padded_tokens(lengths, batch_size=2, order=length_sorted_order(lengths)) < padded_tokens(lengths, batch_size=2)
+
+def test_sentiment_cache_counts_hits_and_evicts_lru():
+    cache = SentimentCache(model_version="m1", max_entries=2)
+    a, b, c = cache.key("love this"), cache.key("first"), cache.key("meh")
+    cache.set_many({a: {'label': 'Positive', 'score': 0.9}, b: {'label': 'Neutral', 'score': 0.6}})
+    cache.get_many([a])  # touch a so b is the least recently used
+    cache.set_many({c: {'label': 'Negative', 'score': 0.7}})
+
+    assert cache.get_many([a, b, c]) == [{'label': 'Positive', 'score': 0.9}, None, {'label': 'Negative', 'score': 0.7}]
+    assert cache.stats()['local_hits'] == 3
+    assert cache.stats()['misses'] == 1
+
+def test_sentiment_cache_key_normalizes_text_and_includes_model_version():
+    cache = SentimentCache(model_version="m1")
+    assert cache.key("Love  this ") == cache.key("love this")
+    assert SentimentCache(model_version="m2").key("love this") != cache.key("love this")
+
+def test_sentiment_cache_promotes_shared_hits(mocker):
+    redis_client = mocker.MagicMock()
+    redis_client.mget.return_value = [json.dumps({'label': 'Positive', 'score': 0.8}), None]
+    cache = SentimentCache(model_version="m1", redis_client=redis_client)
+    keys = [cache.key("love this"), cache.key("meh")]
+
+    assert cache.get_many(keys) == [{'label': 'Positive', 'score': 0.8}, None]
+    assert cache.get_many(keys[:1]) == [{'label': 'Positive', 'score': 0.8}]
+    assert cache.stats() == {'local_hits': 1, 'shared_hits': 1, 'misses': 1, 'hit_rate': 2 / 3}
+    redis_client.mget.assert_called_once()
+
+def test_classify_trivial_skips_empty_and_mention_only_texts():
+    assert classify_trivial("").skipped
+    assert classify_trivial("@someone").skipped
+
+def test_classify_trivial_uses_lookup_table():
+    fire = classify_trivial("🔥🔥🔥")
+    assert (fire.sentiment, fire.skipped) == ("Very Positive", False)
+    assert classify_trivial("❤️ @creator").sentiment == "Very Positive"
+
+def test_classify_trivial_defers_to_model():
+    assert classify_trivial("love 😢") is None  # table entries disagree
+    assert classify_trivial("good video") is None
+    assert classify_trivial("🦄") is None
+
+def test_coalescer_merges_concurrent_requests():
+    calls = []
+    def infer(texts):
+        calls.append(list(texts))
+        return [t.upper() for t in texts]
+
+    async def scenario():
+        coalescer = InferenceCoalescer(infer, ThreadPoolExecutor(max_workers=1), max_batch=100, max_wait=0.05)
+        await coalescer.start()
+        results = await asyncio.gather(coalescer.submit(["a", "b"], timeout=1), coalescer.submit(["c"], timeout=1))
+        await coalescer.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [["A", "B"], ["C"]]
+    assert calls == [["a", "b", "c"]]
+
+def test_coalescer_rejects_when_queue_full_and_drops_timed_out_requests():
+    calls = []
+    def infer(texts):
+        calls.append(list(texts))
+        time.sleep(0.2)
+        return texts
+
+    async def scenario():
+        coalescer = InferenceCoalescer(infer, ThreadPoolExecutor(max_workers=1), max_batch=1, max_wait=0, max_pending=1)
+        await coalescer.start()
+        first = asyncio.create_task(coalescer.submit(["slow"], timeout=1))
+        await asyncio.sleep(0.05)  # first batch is now running on the executor
+        waiting = asyncio.create_task(coalescer.submit(["late"], timeout=0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(CoalescerOverloaded):
+            await coalescer.submit(["rejected"], timeout=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await waiting
+        assert await first == ["slow"]
+        await asyncio.sleep(0.05)
+        await coalescer.stop()
+
+    asyncio.run(scenario())
+    assert calls == [["slow"]]
+
+def _message(mocker, delivery_tag, comments, redelivered=False):
+    return mocker.Mock(delivery_tag=delivery_tag, redelivered=redelivered), {'job_id': 'job', 'comments': comments}
+
+def _analyze_failing_on(poison):
+    def analyze(texts):
+        if poison in texts:
+            raise RuntimeError("cannot analyze")
+        return [f"result:{text}" for text in texts]
+    return analyze
+
+@pytest.mark.parametrize("redelivered", [False, True])
+def test_process_batch_isolates_poison_message(mocker, redelivered):
+    ch = mocker.Mock()
+    publish = mocker.Mock()
+    poison = _message(mocker, 1, ["bad"], redelivered=redelivered)
+    good = _message(mocker, 2, ["a", "b"])
+
+    assert process_batch(ch, [poison, good], _analyze_failing_on("bad"), publish) is False
+
+    publish.assert_called_once_with(ch, good[0], good[1], ["result:a", "result:b"])
+    # A first failure may be transient and is requeued; only a redelivered message is dropped
+    ch.basic_nack.assert_called_once_with(delivery_tag=1, requeue=not redelivered)
+
+def test_process_batch_splits_results_per_message(mocker):
+    ch = mocker.Mock()
+    publish = mocker.Mock()
+    first, second = _message(mocker, 1, ["a"]), _message(mocker, 2, ["b", "c"])
+
+    assert process_batch(ch, [first, second], _analyze_failing_on("bad"), publish) is True
+
+    assert [c.args[3] for c in publish.call_args_list] == [["result:a"], ["result:b", "result:c"]]
+    ch.basic_nack.assert_not_called()
+
+@pytest.fixture
+def fork_mocks(mocker):
+    mocker.patch.object(supervisor.gc, 'freeze')
+    return {
+        'fork': mocker.patch.object(supervisor.os, 'fork'),
+        'waitpid': mocker.patch.object(supervisor.os, 'waitpid'),
+        'kill': mocker.patch.object(supervisor.os, 'kill'),
+        'signal': mocker.patch.object(supervisor.signal, 'signal'),
+        'sleep': mocker.patch.object(supervisor.time, 'sleep'),
+    }
+
+def test_supervisor_respawns_worker_that_exits(mocker, fork_mocks):
+    fork_mocks['fork'].side_effect = [101, 102]
+    fork_mocks['waitpid'].side_effect = [(101, 256), ChildProcessError()]
+    worker_main = mocker.Mock()
+
+    supervisor.supervise(1, worker_main)
+
+    assert fork_mocks['fork'].call_count == 2
+    worker_main.assert_not_called()  # only the forked child runs it
+
+def test_supervisor_shutdown_does_not_wait_out_restart_backoff(mocker, fork_mocks):
+    mocker.patch.object(supervisor, 'restart_delay', return_value=60)
+    fork_mocks['fork'].side_effect = [101, 102]
+
+    polls = iter([(101, 256), None, (102, 15)])
+
+    def waitpid(pid, options):
+        # Worker 101 dies, SIGTERM arrives while its restart is pending, then worker 102 exits on it
+        result = next(polls)
+        if result is None:
+            handler = fork_mocks['signal'].call_args_list[0].args[1]
+            handler(signal.SIGTERM, None)
+            return 0, 0
+        return result
+    fork_mocks['waitpid'].side_effect = waitpid
+
+    started = time.monotonic()
+    supervisor.supervise(2, mocker.Mock())
+
+    assert time.monotonic() - started < 1
+    assert fork_mocks['fork'].call_count == 2
+    fork_mocks['kill'].assert_called_once_with(102, signal.SIGTERM)
+    assert all(c.args[0] <= supervisor.POLL_INTERVAL_SECONDS for c in fork_mocks['sleep'].call_args_list)
+
+def test_restart_delay_backs_off_exponentially_up_to_cap():
+    assert [supervisor.restart_delay(n) for n in range(4)] == [0, 1, 3, 7]
+    assert supervisor.restart_delay(20) == supervisor.AI_WORKER_RESTART_MAX_DELAY_SECONDS
+
+@pytest.mark.parametrize("backend", ["quantized", "onnx"])
+def test_backend_parity_with_torch(backend):
+    pytest.importorskip("transformers")
+    if backend == "onnx":
+        pytest.importorskip("optimum.onnxruntime")
+    from src.ai_service.backends import load_sentiment_pipeline
+
+    reference = load_sentiment_pipeline("torch")(PARITY_TEXTS, truncation=True)
+    candidate = load_sentiment_pipeline(backend)(PARITY_TEXTS, truncation=True)
+
+    agreement = sum(r['label'] == c['label'] for r, c in zip(reference, candidate)) / len(PARITY_TEXTS)
+    assert agreement >= 0.9, f"{backend} agrees with torch on {agreement:.0%} of labels"
+
+    drift = [abs(r['score'] - c['score']) for r, c in zip(reference, candidate) if r['label'] == c['label']]
+    if drift:
+        assert sum(drift) / len(drift) <= 0.05
@@ -0,0 +1,54 @@
+import gzip
+import json
+import pytest
+import pika
+from src.codec import encode, decode, CodecError, CODEC_VERSION_HEADER
+
+PAYLOAD = {
+    'job_id': 'job-1',
+    'interval_timestamp': '2025-01-01T00:00:00Z',
+    'results': {'sentiment': ['positive', 'negative'], 'confidence': [0.9, 0.75], 'skipped': [False, True]},
+}
+
+def test_msgpack_round_trip():
+    pytest.importorskip("msgpack")
+    body, properties = encode(PAYLOAD, message_format="msgpack", compression="none")
+    assert properties.content_type == "application/msgpack"
+    assert properties.content_encoding is None
+    assert decode(body, properties) == PAYLOAD
+
+def test_json_round_trip():
+    body, properties = encode(PAYLOAD, message_format="json", compression="none")
+    assert properties.content_type == "application/json"
+    assert decode(body, properties) == PAYLOAD
+
+def test_legacy_untagged_json_is_decoded():
+    assert decode(json.dumps(PAYLOAD), pika.BasicProperties()) == PAYLOAD
+    assert decode(json.dumps(PAYLOAD).encode("utf-8"), None) == PAYLOAD
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_compression_applies_above_threshold(compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    big = {**PAYLOAD, 'comments': ["great video " * 20] * 100}
+    body, properties = encode(big, message_format="json", compression=compression, threshold=1024)
+    assert properties.content_encoding == compression
+    assert len(body) < len(json.dumps(big))
+    assert decode(body, properties) == big
+
+    body, properties = encode(PAYLOAD, message_format="json", compression=compression, threshold=1024)
+    assert properties.content_encoding is None
+
+def test_gzip_body_from_other_producer_is_decoded():
+    properties = pika.BasicProperties(content_type="application/json", content_encoding="gzip")
+    assert decode(gzip.compress(json.dumps(PAYLOAD).encode("utf-8")), properties) == PAYLOAD
+
+def test_newer_codec_version_is_rejected():
+    body, properties = encode(PAYLOAD, message_format="json", compression="none")
+    properties.headers = {CODEC_VERSION_HEADER: 99}
+    with pytest.raises(CodecError):
+        decode(body, properties)
+
+def test_malformed_body_raises_value_error():
+    with pytest.raises(ValueError):
+        decode(b"\xff not json", pika.BasicProperties(content_type="application/json"))
@@ -1,10 +1,221 @@
 import pytest
+import json
+from datetime import datetime, timezone
+from src.ingestion_service import youtube_fetcher, coalescer
+from src.ingestion_service.coalescer import fetch_comments_coalesced
+from src.ingestion_service.dedup import filter_unseen, mark_seen
 from src.ingestion_service.youtube_fetcher import fetch_comments
-from src.ingestion_service.preprocessor import preprocess_text
+from src.ingestion_service.preprocessor import preprocess_text, preprocess_texts
+
+def _page(published_ats, next_page_token=None):
+    items = [{
+        "id": f"c-{ts}",
+        "snippet": {"topLevelComment": {"snippet": {"publishedAt": ts, "textOriginal": f"comment {ts}", "likeCount": 1}}}
+    } for ts in published_ats]
+    response = {"items": items}
+    if next_page_token:
+        response["nextPageToken"] = next_page_token
+    return response
 
 def test_fetch_comments(mocker):
     mocker.patch('googleapiclient.discovery.build')  # Mock API
     # Add assertions for mock response
 
+def test_fetch_comments_stops_at_since(mocker):
+    youtube = mocker.patch.object(youtube_fetcher, 'youtube')
+    list_call = youtube.commentThreads.return_value.list
+    list_call.return_value.execute.side_effect = [
+        _page(["2025-01-03T00:00:00Z", "2025-01-02T12:00:00Z"], next_page_token="p2"),
+        _page(["2025-01-02T06:00:00Z", "2025-01-02T00:00:00Z", "2025-01-01T00:00:00Z"], next_page_token="p3"),
+        _page(["2024-12-31T00:00:00Z"]),
+    ]
+
+    comments = fetch_comments("vid", since=datetime(2025, 1, 2, 0, 0))
+
+    assert [c["published_at"] for c in comments] == ["2025-01-03T00:00:00Z", "2025-01-02T12:00:00Z", "2025-01-02T06:00:00Z"]
+    assert list_call.call_count == 2  # third page is never requested
+
+def test_fetch_comments_without_since_reads_all_pages(mocker):
+    youtube = mocker.patch.object(youtube_fetcher, 'youtube')
+    list_call = youtube.commentThreads.return_value.list
+    list_call.return_value.execute.side_effect = [
+        _page(["2025-01-03T00:00:00Z"], next_page_token="p2"),
+        _page(["2025-01-01T00:00:00Z"]),
+    ]
+
+    comments = fetch_comments("vid", since=None)
+
+    assert len(comments) == 2
+    assert comments[0]["comment_id"] == "c-2025-01-03T00:00:00Z"
+
+def _cached_entry(since, published_ats, fetched_at="2025-01-03T00:00:00+00:00"):
+    return json.dumps({
+        'since': since,
+        'fetched_at': fetched_at,
+        'comments': [{'comment_id': ts, 'text': ts, 'published_at': ts, 'metrics': {}} for ts in published_ats]
+    })
+
+def test_coalesced_fetch_filters_cached_comments_by_watermark(mocker):
+    fetch = mocker.patch.object(coalescer, 'fetch_comments')
+    client = mocker.MagicMock()
+    client.get.return_value = _cached_entry("2025-01-01T00:00:00+00:00", ["2025-01-03T00:00:00Z", "2025-01-02T00:00:00Z"])
+
+    comments, _ = fetch_comments_coalesced(client, "vid", since=datetime(2025, 1, 2, 12, 0))
+
+    assert [c['published_at'] for c in comments] == ["2025-01-03T00:00:00Z"]
+    fetch.assert_not_called()
+    client.lock.assert_not_called()
+
+def test_coalesced_fetch_refetches_when_cache_starts_after_watermark(mocker):
+    fetch = mocker.patch.object(coalescer, 'fetch_comments', return_value=[])
+    client = mocker.MagicMock()
+    client.get.return_value = _cached_entry("2025-01-02T00:00:00+00:00", ["2025-01-03T00:00:00Z"])
+
+    fetch_comments_coalesced(client, "vid", since=datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+    fetch.assert_called_once_with("vid", since=datetime(2025, 1, 1, tzinfo=timezone.utc))
+    client.set.assert_called_once()
+    client.lock.return_value.release.assert_called_once()
+
+def test_coalesced_fetch_reports_when_the_cached_fetch_ran(mocker):
+    # The cache was filled before this read; the watermark must not move past that fetch
+    fetch = mocker.patch.object(coalescer, 'fetch_comments')
+    client = mocker.MagicMock()
+    client.get.return_value = _cached_entry("2025-01-01T00:00:00+00:00", [], fetched_at="2025-01-03T00:00:00+00:00")
+
+    comments, fetched_at = fetch_comments_coalesced(client, "vid", since=datetime(2025, 1, 2, tzinfo=timezone.utc))
+
+    assert comments == []
+    assert fetched_at == datetime(2025, 1, 3, tzinfo=timezone.utc)
+    assert fetched_at < datetime.now(timezone.utc)
+    fetch.assert_not_called()
+
+def test_coalesced_fetch_caches_its_start_time(mocker):
+    mocker.patch.object(coalescer, 'fetch_comments', return_value=[])
+    client = mocker.MagicMock()
+    client.get.return_value = None
+    before = datetime.now(timezone.utc)
+
+    _, fetched_at = fetch_comments_coalesced(client, "vid", since=datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+    assert before <= fetched_at <= datetime.now(timezone.utc)
+    assert json.loads(client.set.call_args.args[1])['fetched_at'] == fetched_at.isoformat()
+
+def test_filter_unseen_drops_seen_and_repeated_ids(mocker):
+    client = mocker.MagicMock()
+    client.smismember.return_value = [1, 0]
+    comments = [{'comment_id': 'a'}, {'comment_id': 'b'}, {'comment_id': 'b'}]
+
+    assert filter_unseen(client, "job", comments) == [{'comment_id': 'b'}]
+    client.smismember.assert_called_once_with("vibesense:seen:job", ['a', 'b'])
+
+def test_mark_seen_expires_with_job(mocker):
+    client = mocker.MagicMock()
+    expires_at = datetime(2025, 1, 8, tzinfo=timezone.utc)
+
+    mark_seen(client, "job", iter(['a', 'b']), expires_at)
+
+    pipe = client.pipeline.return_value
+    pipe.sadd.assert_called_once_with("vibesense:seen:job", 'a', 'b')
+    pipe.expireat.assert_called_once_with("vibesense:seen:job", expires_at)
+    pipe.execute.assert_called_once()
+
 def test_preprocess_text():
-    assert preprocess_text("Hello, world! https://example.com") == "hello world"
\ No newline at end of file
+    assert preprocess_text("Hello, world! https://example.com") == "hello world"
+
+@pytest.mark.requires_model
+def test_preprocess_texts_matches_single_text():
+    texts = ["Hello, world! https://example.com", "This is THE best video ever!!!", ""]
+    assert preprocess_texts(texts, batch_size=2) == [preprocess_text(t) for t in texts]
+
+def _beat_app(redis_client):
+    from celery import Celery
+    from src.ingestion_service.scheduler import configure_celery_beat
+    app = Celery('test')
+    configure_celery_beat(app)
+    app.conf.redbeat_redis_url = "redis://localhost:6379/0"
+    app.redbeat_redis = redis_client
+    return app
+
+def test_save_entries_matches_redbeat_save():
+    fakeredis = pytest.importorskip("fakeredis")
+    from redbeat import RedBeatSchedulerEntry
+    from src.ingestion_service.scheduler import save_entries
+
+    def entries(app):
+        return [RedBeatSchedulerEntry(
+            name=f"ingest-job-{i}",
+            task="src.ingestion_service.tasks.process_job_task",
+            schedule=3600.0,
+            args=[{"job_id": str(i), "post_id": "abc"}],
+            app=app
+        ) for i in range(3)]
+
+    one_by_one, pipelined = fakeredis.FakeRedis(), fakeredis.FakeRedis()
+    app = _beat_app(one_by_one)
+    for entry in entries(app):
+        entry.save()
+    bulk_app = _beat_app(pipelined)
+    assert save_entries(bulk_app, entries(bulk_app)) == 3
+
+    assert sorted(one_by_one.keys()) == sorted(pipelined.keys())
+    for key in one_by_one.keys():
+        if one_by_one.type(key) == b'hash':
+            # meta holds last_run_at, which each entry stamps with its construction time
+            assert one_by_one.hget(key, 'definition') == pipelined.hget(key, 'definition')
+            assert pipelined.hexists(key, 'meta')
+        else:
+            assert one_by_one.zrange(key, 0, -1) == pipelined.zrange(key, 0, -1)
+
+@pytest.fixture
+def lua_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeRedis()
+
+def test_wheel_pops_due_jobs_and_reschedules(lua_redis):
+    from src.ingestion_service import wheel
+    wheel.add_jobs(lua_redis, [
+        {"job_id": "a", "post_id": "p1", "interval": 60, "expires_at": 1000},
+        {"job_id": "b", "post_id": "p2", "interval": 300, "expires_at": 1000},
+    ], now=100)
+
+    assert sorted(j["job_id"] for j in wheel.pop_due(lua_redis, 10, now=100)) == ["a", "b"]
+    assert wheel.pop_due(lua_redis, 10, now=120) == []
+    assert wheel.pop_due(lua_redis, 10, now=160) == [{"job_id": "a", "post_id": "p1"}]
+    # A late tick does not replay the intervals it missed
+    assert wheel.pop_due(lua_redis, 10, now=500) == [{"job_id": "a", "post_id": "p1"}, {"job_id": "b", "post_id": "p2"}]
+    assert lua_redis.zscore(wheel.DUE_KEY, "a") == 560
+
+def test_wheel_drops_jobs_at_expiry_and_honours_limit(lua_redis):
+    from src.ingestion_service import wheel
+    wheel.add_jobs(lua_redis, [{"job_id": str(i), "post_id": "p", "interval": 60, "expires_at": 130} for i in range(5)], now=0)
+
+    assert len(wheel.pop_due(lua_redis, 3, now=0)) == 3
+    assert len(wheel.pop_due(lua_redis, 3, now=0)) == 2
+    assert len(wheel.pop_due(lua_redis, 10, now=60)) == 5  # next due 120 < expiry, kept
+    assert len(wheel.pop_due(lua_redis, 10, now=120)) == 5  # next due 180 >= expiry, removed after this run
+    assert lua_redis.zcard(wheel.DUE_KEY) == 0 and lua_redis.hlen(wheel.JOBS_KEY) == 0
+
+    wheel.add_jobs(lua_redis, [{"job_id": "x", "post_id": "p", "interval": 60, "expires_at": 130}], now=0)
+    wheel.remove_jobs(lua_redis, ["x"])
+    assert wheel.pop_due(lua_redis, 10, now=10) == []
+
+def test_remove_schedule_entries_clears_redbeat_and_wheel(lua_redis):
+    from redbeat import RedBeatSchedulerEntry
+    from src.ingestion_service import wheel
+    from src.ingestion_service.scheduler import save_entries, remove_schedule_entries
+
+    app = _beat_app(lua_redis)
+    save_entries(app, [RedBeatSchedulerEntry(
+        name=f"ingest-job-{job_id}", task="src.ingestion_service.tasks.process_job_task",
+        schedule=3600.0, args=[{"job_id": job_id, "post_id": "abc"}], app=app
+    ) for job_id in ("a", "b")])
+    wheel.add_jobs(lua_redis, [{"job_id": job_id, "post_id": "abc", "interval": 60, "expires_at": 1e12} for job_id in ("a", "c")])
+
+    remove_schedule_entries(app, ["a", "c"])
+
+    assert lua_redis.exists("redbeat:ingest-job-a") == 0
+    assert lua_redis.exists("redbeat:ingest-job-b") == 1
+    assert lua_redis.zrange(app.redbeat_conf.schedule_key, 0, -1) == [b"redbeat:ingest-job-b"]
+    assert lua_redis.zcard(wheel.DUE_KEY) == 0 and lua_redis.hlen(wheel.JOBS_KEY) == 0
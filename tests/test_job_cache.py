@@ -0,0 +1,66 @@
+import uuid
+from datetime import datetime
+import pytest
+from src.models import MonitoringJobDB
+from src.job_cache import JobCache
+
+JOB_ID = "00000000-0000-0000-0000-000000000001"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _session_factory(mocker, job):
+    factory = mocker.MagicMock()
+    factory.return_value.query.return_value.filter.return_value.first.return_value = job
+    return factory
+
+@pytest.fixture
+def job():
+    return MonitoringJobDB(
+        job_id=uuid.UUID(JOB_ID), post_id="abc", post_title="Video", user_full_name="Sam", email="sam@example.com",
+        intervals_seconds=3600, total_duration_seconds=86400, created_at=datetime(2025, 1, 1)
+    )
+
+def test_job_cache_serves_repeat_lookups_until_ttl(mocker, job):
+    clock = FakeClock()
+    factory = _session_factory(mocker, job)
+    cache = JobCache(factory, ttl_seconds=60, clock=clock)
+
+    first = cache.get(JOB_ID)
+    assert first.job_id == JOB_ID and first.email == "sam@example.com" and first.intervals_seconds == 3600
+    assert cache.get(JOB_ID) == first
+    assert factory.call_count == 1
+    factory.return_value.close.assert_called_once()
+
+    clock.now = 61
+    cache.get(JOB_ID)
+    assert factory.call_count == 2
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'hit_rate': pytest.approx(1 / 3), 'entries': 1}
+
+def test_job_cache_invalidation(mocker, job):
+    factory = _session_factory(mocker, job)
+    cache = JobCache(factory)
+    cache.get(JOB_ID)
+    cache.invalidate(JOB_ID)
+    cache.get(JOB_ID)
+    assert factory.call_count == 2
+
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0
+
+def test_job_cache_does_not_cache_missing_jobs(mocker):
+    factory = _session_factory(mocker, None)
+    cache = JobCache(factory)
+    assert cache.get(JOB_ID) is None
+    assert cache.get(JOB_ID) is None
+    assert factory.call_count == 2
+
+def test_job_cache_evicts_least_recently_used(mocker, job):
+    cache = JobCache(_session_factory(mocker, job), max_entries=1)
+    cache.get(JOB_ID)
+    cache.get("00000000-0000-0000-0000-000000000002")
+    assert cache.stats()['entries'] == 1
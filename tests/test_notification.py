@@ -0,0 +1,89 @@
+import socket
+from email.message import EmailMessage
+import pytest
+from src.models import Aggregate
+from src.notification_service.smtp_pool import SMTPPool
+from src.notification_service.digest import DigestBuffer
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        self.peers.add(session.peer)
+        return "250 OK"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller.port, handler
+    controller.stop()
+
+def _message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg['From'] = "alerts@vibesense.test"
+    msg['To'] = f"user{i}@vibesense.test"
+    msg['Subject'] = f"Update {i}"
+    msg.set_content("hello")
+    return msg
+
+def test_pool_reuses_sessions_across_sends(smtp_server):
+    port, handler = smtp_server
+    pool = SMTPPool("127.0.0.1", port, starttls=False, size=2)
+    futures = [pool.submit(_message(i)) for i in range(10)]
+    for future in futures:
+        future.result(timeout=10)
+    pool.close()
+
+    assert len(handler.messages) == 10
+    assert pool.stats()['sessions_opened'] <= 2
+    assert len(handler.peers) <= 2
+
+def test_pool_reconnects_dropped_session(smtp_server):
+    port, handler = smtp_server
+    pool = SMTPPool("127.0.0.1", port, starttls=False, size=1)
+    pool.send(_message(0))
+    pool._idle.queue[0].close()  # as if the server had timed the idle session out
+
+    pool.send(_message(1))
+    pool.close()
+    assert len(handler.messages) == 2
+    assert pool.stats()['sessions_opened'] == 2
+
+def test_pool_surfaces_connection_failures():
+    pool = SMTPPool("127.0.0.1", 1, starttls=False, size=1, timeout=1)
+    with pytest.raises(OSError):
+        pool.submit(_message(0)).result(timeout=10)
+    pool.close()
+
+def _aggregate(interval_sentiment, overall_sentiment):
+    return Aggregate(interval_sentiment=interval_sentiment, interval_confidence=interval_sentiment / 2,
+                     overall_sentiment=overall_sentiment, overall_confidence=0.8, overall_ci=(overall_sentiment - 0.1, overall_sentiment + 0.1))
+
+def test_digest_merges_intervals_and_keeps_latest_overall():
+    digests = DigestBuffer()
+    assert digests.add("job-1", _aggregate(1.0, 1.2), "2025-01-01T02:00:00Z", 1)
+    assert not digests.add("job-1", _aggregate(2.0, 1.5), "2025-01-01T03:00:00Z", 2)
+    assert not digests.add("job-1", _aggregate(0.0, 0.9), "2025-01-01T01:00:00Z", 3)  # arrived late
+    assert digests.add("job-2", _aggregate(1.0, 1.0), "2025-01-01T03:00:00Z", 4)
+
+    digest = digests.pop("job-1")
+    merged = digest.merged()
+    assert digest.delivery_tags == [1, 2, 3]
+    assert digest.interval_timestamp == "2025-01-01T03:00:00Z"
+    assert merged.interval_sentiment == pytest.approx(1.0)
+    assert merged.interval_confidence == pytest.approx(0.5)
+    assert merged.overall_sentiment == 1.5
+    assert merged.overall_ci == (1.4, 1.6)
+    assert digests.pop("job-1") is None
+    assert digests.job_ids() == ["job-2"]
@@ -0,0 +1,59 @@
+import pytest
+from src.ingestion_service.preprocessor import preprocess_texts
+
+SAMPLE_COMMENTS = [
+    "Hello, world! https://example.com",
+    "This is THE best video ever!!!",
+    "I don't think it's that good tbh",
+    "first!",
+    "🔥🔥🔥",
+    "love this ❤️",
+    "Who's watching in 2025? 🙋‍♂️",
+    "@someone you need to see this lol",
+    "Check out my channel www.example.org/channel",
+    "10/10 would watch again",
+    "The editing at 3:45 is insane, how long did it take?",
+    "can't stop listening... won't stop either",
+    "Meh. It was ok, I guess.",
+    "Absolutely terrible audio quality, couldn't hear anything",
+    "LOL 😂😂 this is so funny",
+    "Great tutorial! Step-by-step and easy to follow.",
+    "¿Dónde está la versión en español?",
+    "Not gonna lie, the ending made me cry 😭",
+    "",
+    "#1 on trending!!! let's gooo",
+]
+
+def token_agreement(reference: list, candidate: list) -> float:
+    """Mean Jaccard similarity of the token sets produced for each text."""
+    scores = []
+    for ref, cand in zip(reference, candidate):
+        ref_tokens, cand_tokens = set(ref.split()), set(cand.split())
+        union = ref_tokens | cand_tokens
+        scores.append(len(ref_tokens & cand_tokens) / len(union) if union else 1.0)
+    return sum(scores) / len(scores)
+
+def exact_match_rate(reference: list, candidate: list) -> float:
+    return sum(r == c for r, c in zip(reference, candidate)) / len(reference)
+
+@pytest.mark.requires_model
+def test_tokenizer_backend_matches_model():
+    reference = preprocess_texts(SAMPLE_COMMENTS, backend="model")
+    assert preprocess_texts(SAMPLE_COMMENTS, backend="tokenizer") == reference
+
+@pytest.mark.requires_model
+def test_regex_backend_close_to_model():
+    reference = preprocess_texts(SAMPLE_COMMENTS, backend="model")
+    candidate = preprocess_texts(SAMPLE_COMMENTS, backend="regex")
+    assert token_agreement(reference, candidate) >= 0.9
+    assert exact_match_rate(reference, candidate) >= 0.75
+
+def test_regex_backend_close_to_tokenizer():
+    reference = preprocess_texts(SAMPLE_COMMENTS, backend="tokenizer")
+    candidate = preprocess_texts(SAMPLE_COMMENTS, backend="regex")
+    assert token_agreement(reference, candidate) >= 0.9
+    assert exact_match_rate(reference, candidate) >= 0.75
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        preprocess_texts(["hello"], backend="bogus")
@@ -1,5 +1,6 @@
 import pytest
-from src.utils import parse_youtube_video_id
+import statistics
+from src.utils import parse_youtube_video_id, welford_update, mean_confidence_interval
 
 def test_parse_valid_youtube_video_id():
     assert parse_youtube_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ") == "dQw4w9WgXcQ"
@@ -14,4 +15,19 @@ def test_parse_invalid_youtube_video_id():
     with pytest.raises(ValueError):
         parse_youtube_video_id("https://youtu.be/")
     with pytest.raises(ValueError):
-        parse_youtube_video_id("invalid_url")
\ No newline at end of file
+        parse_youtube_video_id("invalid_url")
+
+def test_welford_update_matches_batch_statistics():
+    values = [1.2, 0.4, 1.9, 1.0, 0.7]
+    count, mean, m2 = 0, 0.0, 0.0
+    for value in values:
+        count, mean, m2 = welford_update(count, mean, m2, value)
+    assert count == len(values)
+    assert mean == pytest.approx(statistics.mean(values))
+    assert m2 / (count - 1) == pytest.approx(statistics.variance(values))
+
+def test_mean_confidence_interval():
+    assert mean_confidence_interval(1, 1.5, 0.0) == (1.5, 1.5)
+    low, high = mean_confidence_interval(4, 1.0, 0.12)
+    half_width = 1.96 * (0.12 / 3 / 4) ** 0.5
+    assert (low, high) == (pytest.approx(1.0 - half_width), pytest.approx(1.0 + half_width))